@@ -1,11 +1,27 @@
 from django.contrib import admin
 
+from . import search
+from .forms import PostForm
 from .models import Comment, Group, Post
 
 
-class PostAdmin(admin.ModelAdmin):
+class FullTextSearchMixin:
+    """The mixin makes the admin search use the full-text index
+    instead of scanning the table with LIKE."""
+    def get_search_results(self, request, queryset, search_term):
+        if not search.match_expression(search_term):
+            return super().get_search_results(
+                request, queryset, search_term
+            )
+        return search.filter_queryset(queryset, search_term), False
+
+
+class PostAdmin(FullTextSearchMixin, admin.ModelAdmin):
     """The model describes the fields, search and
-    filters of the publication object in the admin panel."""
+    filters of the publication object in the admin panel.
+    Images are uploaded through the same pipeline as on the site."""
+    form = PostForm
+    fields = ('text', 'author', 'group', 'image')
     list_display = ('pk', 'text', 'pub_date', 'author')
     search_fields = ('text',)
     list_filter = ('pub_date',)
@@ -21,7 +37,7 @@ class GroupAdmin(admin.ModelAdmin):
     empty_value_display = '-пусто-'
 
 
-class CommentAdmin(admin.ModelAdmin):
+class CommentAdmin(FullTextSearchMixin, admin.ModelAdmin):
     """The model allows you to moderate comments in the admin panel."""
     list_display = ('pk', 'post', 'author', 'text', 'created')
     search_fields = ('text',)
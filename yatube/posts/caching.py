@@ -0,0 +1,188 @@
+import hashlib
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import connections
+
+GENERATION_KEY = 'posts:generation'
+# The worker regenerating an entry holds its lock not longer than this.
+LOCK_TIMEOUT = 30
+# Without an outdated value to serve, the others wait for the lock
+# holder this long before computing the value themselves.
+LOCK_WAIT = 2.0
+LOCK_POLL = 0.05
+
+# The number of the versions moved by the current thread, so the page
+# cache can tell the requests that changed something.
+_changes = threading.local()
+
+
+def _initial_generation():
+    # Milliseconds since the epoch: a generation restored after eviction
+    # is larger than any one the stale fragments were saved under.
+    return int(time.time() * 1000)
+
+
+def _generation_key(scope):
+    if scope is None:
+        return GENERATION_KEY
+    return f'{GENERATION_KEY}:{scope}'
+
+
+def author_scope(author_id):
+    """The scope of the pages of the author: the profile and the posts."""
+    return f'author:{author_id}'
+
+
+def group_scope(group_id):
+    """The scope of the group page."""
+    return f'group:{group_id}'
+
+
+def post_scope(post_id):
+    """The scope of the page of a single post."""
+    return f'post:{post_id}'
+
+
+def post_scopes(post):
+    """The function returns the scopes of all pages showing the post."""
+    scopes = [author_scope(post.author_id), post_scope(post.pk)]
+    if post.group_id is not None:
+        scopes.append(group_scope(post.group_id))
+    return scopes
+
+
+def get_generation(scope=None):
+    """The function returns the current version of the cached pages.
+    Without a scope it is the version of the whole site."""
+    key = _generation_key(scope)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, _initial_generation(), None)
+        generation = cache.get(key)
+    return generation
+
+
+def get_generations(scopes):
+    """The function returns the versions of several scopes
+    in one request to the cache."""
+    keys = {_generation_key(scope): scope for scope in scopes}
+    found = cache.get_many(keys)
+    return [
+        found[key] if key in found else get_generation(scope)
+        for key, scope in keys.items()
+    ]
+
+
+def changes():
+    """The function returns the number of the versions moved
+    by the current thread so far."""
+    return getattr(_changes, 'count', 0)
+
+
+def _bump(key):
+    _changes.count = changes() + 1
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, _initial_generation(), None)
+        return cache.incr(key)
+
+
+def bump_generation():
+    """The function invalidates all cached pages at once
+    by moving to the next version."""
+    return _bump(GENERATION_KEY)
+
+
+def bump_scopes(*scopes):
+    """The function moves the versions of the given scopes only."""
+    for scope in set(scopes):
+        _bump(_generation_key(scope))
+
+
+def page_etag(request, *scopes):
+    """The function builds the validator of the page from the versions
+    of its scopes, the query string and the viewer without rendering
+    the page. The scopes and their versions are remembered on the
+    request for the page cache."""
+    generations = get_generations(scopes)
+    request.page_scopes = scopes, generations
+    raw = '|'.join(map(str, [
+        *scopes, *generations, request.GET.urlencode(), request.user.pk
+    ]))
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def _lock_key(key):
+    return f'{key}:lock'
+
+
+def acquire(key):
+    """The function takes the lock on regenerating the entry.
+    Returns False if another worker holds it."""
+    return cache.add(_lock_key(key), 1, LOCK_TIMEOUT)
+
+
+def release(key):
+    """The function frees the lock taken by acquire()."""
+    cache.delete(_lock_key(key))
+
+
+def _store(key, value, timeout, version):
+    # The entry outlives its freshness, so there is an outdated value
+    # to serve while the next one is computed.
+    cache.set(key, (version, time.time() + timeout, value), timeout * 2)
+    return value
+
+
+def _refresh(key, compute, timeout, version):
+    try:
+        return _store(key, compute(), timeout, version)
+    finally:
+        release(key)
+
+
+def _refresh_in_background(key, compute, timeout, version):
+    try:
+        _refresh(key, compute, timeout, version)
+    finally:
+        connections.close_all()
+
+
+def cached_value(key, compute, timeout, version=None, background=False):
+    """The function returns the value of compute() kept in the cache for
+    timeout seconds and for the given version of the data.
+
+    An outdated value is computed again by one worker only: the one
+    taking the lock. The others serve the outdated value meanwhile.
+    With background the lock holder serves it too and the value is
+    computed in a thread. Without any value to serve, the others wait
+    for the lock holder up to LOCK_WAIT seconds.
+    """
+    entry = cache.get(key)
+    if entry is not None:
+        entry_version, fresh_until, value = entry
+        if entry_version == version and fresh_until > time.time():
+            return value
+        if not acquire(key):
+            return value
+        if background:
+            threading.Thread(
+                target=_refresh_in_background,
+                args=(key, compute, timeout, version), daemon=True
+            ).start()
+            return value
+        return _refresh(key, compute, timeout, version)
+    if not acquire(key):
+        deadline = time.monotonic() + LOCK_WAIT
+        while time.monotonic() < deadline:
+            time.sleep(LOCK_POLL)
+            entry = cache.get(key)
+            if entry is not None and entry[0] == version:
+                return entry[2]
+        # The lock holder is too slow or has died: its lock is
+        # left to expire and the value is computed here.
+        return _store(key, compute(), timeout, version)
+    return _refresh(key, compute, timeout, version)
@@ -0,0 +1,179 @@
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Count, F
+
+from .caching import group_scope
+from .models import AuthorStats, FeedStats, Follow, Post
+
+User = get_user_model()
+
+STATS_FIELDS = ('posts_count', 'followers_count', 'following_count')
+ALL_POSTS = 'all'
+# The feed of all posts estimated to be longer is not counted on a page
+# request: the estimate is stored until the counters are recomputed.
+EXACT_COUNT_LIMIT = 100000
+
+
+def _count_by(queryset, field, ids):
+    rows = queryset.filter(**{f'{field}__in': ids}).order_by().values(
+        field
+    ).annotate(total=Count('id')).values_list(field, 'total')
+    return dict(rows)
+
+
+def recount(author_ids):
+    """The function recomputes the counters of the given authors
+    from scratch and saves them."""
+    author_ids = list(author_ids)
+    posts = _count_by(Post.objects, 'author_id', author_ids)
+    followers = _count_by(Follow.objects, 'author_id', author_ids)
+    following = _count_by(Follow.objects, 'user_id', author_ids)
+    with transaction.atomic():
+        existing = AuthorStats.objects.select_for_update().in_bulk(
+            author_ids, field_name='author_id'
+        )
+        for author_id in author_ids:
+            stats = existing.get(author_id) or AuthorStats(
+                author_id=author_id
+            )
+            stats.posts_count = posts.get(author_id, 0)
+            stats.followers_count = followers.get(author_id, 0)
+            stats.following_count = following.get(author_id, 0)
+            existing[author_id] = stats
+        AuthorStats.objects.bulk_update(
+            [stats for stats in existing.values() if stats.pk],
+            STATS_FIELDS
+        )
+        AuthorStats.objects.bulk_create(
+            [stats for stats in existing.values() if not stats.pk],
+            ignore_conflicts=True
+        )
+    return existing
+
+
+def recount_all(batch_size=1000):
+    """The function recomputes the counters of all authors batch by
+    batch and returns the number of the authors."""
+    author_ids = User.objects.order_by('id').values_list('id', flat=True)
+    last_id, total = 0, 0
+    while True:
+        batch = list(author_ids.filter(id__gt=last_id)[:batch_size])
+        if not batch:
+            return total
+        recount(batch)
+        last_id = batch[-1]
+        total += len(batch)
+
+
+def change(author_id, field, delta):
+    """The function atomically shifts the author's counter.
+    A missing record is created by a full recount on increment only,
+    so cascade deletion of the author does not resurrect it."""
+    stats = AuthorStats.objects.filter(author_id=author_id)
+    if delta < 0:
+        stats = stats.filter(**{f'{field}__gte': -delta})
+    updated = stats.update(**{field: F(field) + delta})
+    if not updated and delta > 0:
+        recount([author_id])
+
+
+def author_stats(author):
+    """The function returns the author's counters,
+    creating the record on the first request."""
+    try:
+        return author.stats
+    except AuthorStats.DoesNotExist:
+        return recount([author.id])[author.id]
+
+
+def feed_scopes(group_id):
+    """The function returns the feeds showing a post of the group."""
+    scopes = [ALL_POSTS]
+    if group_id is not None:
+        scopes.append(group_scope(group_id))
+    return scopes
+
+
+def _feed_posts(scope):
+    if scope == ALL_POSTS:
+        return Post.objects.all()
+    return Post.objects.filter(group_id=int(scope.split(':')[1]))
+
+
+def recount_feed(scope):
+    """The function counts the posts of the feed from scratch
+    and saves the number."""
+    count = _feed_posts(scope).order_by().count()
+    FeedStats.objects.update_or_create(
+        scope=scope, defaults={'posts_count': count}
+    )
+    return count
+
+
+def recount_feeds():
+    """The function recomputes the counters of all feeds
+    and returns the number of the feeds."""
+    counts = {ALL_POSTS: Post.objects.order_by().count()}
+    groups = Post.objects.exclude(group=None).order_by().values(
+        'group_id'
+    ).annotate(total=Count('id')).values_list('group_id', 'total')
+    counts.update(
+        (group_scope(group_id), total) for group_id, total in groups
+    )
+    with transaction.atomic():
+        FeedStats.objects.all().delete()
+        FeedStats.objects.bulk_create(
+            FeedStats(scope=scope, posts_count=count)
+            for scope, count in counts.items()
+        )
+    return len(counts)
+
+
+def change_feed(scope, delta):
+    """The function atomically shifts the counter of the feed.
+    A missing record is left missing: the feed is counted
+    on the first request of its pages."""
+    stats = FeedStats.objects.filter(scope=scope)
+    if delta < 0:
+        stats = stats.filter(posts_count__gte=-delta)
+    stats.update(posts_count=F('posts_count') + delta)
+
+
+def estimated_count():
+    """The function estimates the number of all posts by the table
+    statistics gathered by ANALYZE on SQLite.
+    Returns None if there are no statistics."""
+    if connection.vendor != 'sqlite':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'"
+        )
+        if cursor.fetchone() is None:
+            return None
+        cursor.execute(
+            'SELECT stat FROM sqlite_stat1 WHERE tbl = %s',
+            [Post._meta.db_table]
+        )
+        row = cursor.fetchone()
+    return int(row[0].split()[0]) if row else None
+
+
+def feed_count(scope=ALL_POSTS):
+    """The function returns the number of the posts of the feed: the
+    stored one or, if the feed has not been counted yet, the exact
+    number. A long feed of all posts is estimated instead and the
+    estimate is stored. A group feed is counted by its index."""
+    count = FeedStats.objects.filter(scope=scope).values_list(
+        'posts_count', flat=True
+    ).first()
+    if count is not None:
+        return count
+    if scope == ALL_POSTS:
+        estimate = estimated_count()
+        if estimate is not None and estimate > EXACT_COUNT_LIMIT:
+            FeedStats.objects.get_or_create(
+                scope=scope, defaults={'posts_count': estimate}
+            )
+            return estimate
+    return recount_feed(scope)
@@ -0,0 +1,200 @@
+import random
+from array import array
+from datetime import datetime, timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from . import counters, feeds, search, timeline
+from .caching import bump_generation
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+BATCH_SIZE = 5000
+# The shape of the generated data, see generate().
+AUTHOR_SKEW = 2
+FOLLOW_SKEW = 3
+GROUP_SKEW = 3
+GROUP_SHARE = 0.6
+COMMENT_SKEW = 4
+BURST_SECONDS = 3 * 60 * 60
+WORDS = (
+    'день', 'город', 'утро', 'книга', 'дорога', 'море', 'работа', 'кофе',
+    'друг', 'вечер', 'история', 'музыка', 'лето', 'проект', 'дом', 'код',
+    'python', 'django', 'жизнь', 'снег', 'поезд', 'горы', 'кино', 'сад',
+)
+
+
+def bulk_insert(model, objects, ignore_conflicts=False):
+    """The function inserts the objects in batches like bulk_create but
+    keeps the dates set on them in auto_now(_add) fields, as the loading
+    of fixtures does. The fields of the model are left as they are, so
+    the saves made by other threads still get the current time."""
+    connection = connections[router.db_for_write(model)]
+    with_pk = [obj for obj in objects if obj.pk is not None]
+    without_pk = [obj for obj in objects if obj.pk is None]
+    for batch_objects, fields in (
+        (with_pk, model._meta.concrete_fields),
+        (without_pk, [
+            field for field in model._meta.concrete_fields
+            if field is not model._meta.auto_field
+        ]),
+    ):
+        size = max(connection.ops.bulk_batch_size(fields, batch_objects), 1)
+        for start in range(0, len(batch_objects), size):
+            model._base_manager._insert(
+                batch_objects[start:start + size], fields=fields, raw=True,
+                using=connection.alias, ignore_conflicts=ignore_conflicts
+            )
+
+
+def text(rng, words):
+    """The function returns a random text of the given number of words."""
+    return ' '.join(rng.choices(WORDS, k=words)).capitalize()
+
+
+def insert(model, objects, batch_size=BATCH_SIZE, **options):
+    """The function saves the objects produced by the iterable in batches,
+    each in its own transaction, with the dates set on them.
+    Returns the number of the objects."""
+    total, batch = 0, []
+    for obj in objects:
+        batch.append(obj)
+        if len(batch) == batch_size:
+            with transaction.atomic():
+                bulk_insert(model, batch, **options)
+            total += len(batch)
+            batch = []
+    if batch:
+        with transaction.atomic():
+            bulk_insert(model, batch, **options)
+        total += len(batch)
+    return total
+
+
+def rebuild_derived():
+    """The function recomputes the data kept up to date by the signals:
+    the search index, the timelines, the cached newest posts of
+    the authors and the counters of the authors and the feeds."""
+    search.rebuild_index(Post)
+    search.rebuild_index(Comment)
+    timeline.rebuild()
+    feeds.forget_all()
+    counters.recount_all()
+    counters.recount_feeds()
+    bump_generation()
+
+
+def sizes(total):
+    """The function splits the total number of rows between the models
+    in the proportions of the production database."""
+    users = max(total // 100, 10)
+    groups = max(total // 50000, 5)
+    rest = max(total - users - groups, 0)
+    return {
+        'users': users,
+        'groups': groups,
+        'posts': rest * 40 // 100,
+        'comments': rest * 45 // 100,
+        'follows': rest * 15 // 100,
+    }
+
+
+def pick(rng, items, skew=1.0):
+    """The function returns a random item. With skew above 1 the items
+    at the start are chosen much more often than the rest: the chance
+    falls with the position by a power law, like the popularity of
+    authors, groups and posts."""
+    return items[int(len(items) * rng.random() ** skew)]
+
+
+def generate(users=100, groups=5, posts=5000, comments=10000, follows=1000,
+             seed=0, days=365, batch_size=BATCH_SIZE):
+    """The function fills the database with users, groups, posts,
+    comments and subscriptions of a realistic shape, written with
+    bulk_create, then rebuilds the derived data:
+    - a few prolific writers make most posts and a few celebrities have
+      most followers, the rest of the authors are a long tail;
+    - a few huge groups collect most posts of the groups;
+    - comments come in bursts to the hot posts soon after publication.
+    The same seed gives the same data."""
+    rng = random.Random(seed)
+    now = timezone.now()
+    start = now - timedelta(days=days)
+    span = (now - start).total_seconds()
+    last_user = User.objects.order_by('-id').values_list(
+        'id', flat=True
+    ).first() or 0
+    insert(User, (
+        User(username=f'user{last_user + 1 + n}', password='!')
+        for n in range(users)
+    ), batch_size)
+    user_ids = list(User.objects.order_by('id').values_list('id', flat=True))
+    # The users in the order of posting, of popularity and of reading.
+    # The orders are independent: were the celebrities also the most
+    # prolific writers, the timelines would explode.
+    writers = rng.sample(user_ids, len(user_ids))
+    authors = rng.sample(user_ids, len(user_ids))
+    readers = rng.sample(user_ids, len(user_ids))
+    insert(Group, (
+        Group(
+            title=f'Группа {n}', slug=f'group-{seed}-{n}',
+            description=text(rng, 10)
+        )
+        for n in range(groups)
+    ), batch_size, ignore_conflicts=True)
+    group_ids = list(Group.objects.order_by('id').values_list('id', flat=True))
+    rng.shuffle(group_ids)
+    last_post = Post.objects.order_by('-id').values_list(
+        'id', flat=True
+    ).first() or 0
+
+    def make_post():
+        pub_date = start + timedelta(seconds=rng.random() * span)
+        group_id = None
+        if group_ids and rng.random() < GROUP_SHARE:
+            group_id = pick(rng, group_ids, GROUP_SKEW)
+        return Post(
+            author_id=pick(rng, writers, AUTHOR_SKEW), group_id=group_id,
+            text=text(rng, rng.randint(5, 60)),
+            pub_date=pub_date, updated=pub_date
+        )
+
+    insert(Post, (make_post() for _ in range(posts)), batch_size)
+    post_ids, post_dates = array('q'), array('d')
+    new_posts = Post.objects.filter(id__gt=last_post).order_by('id')
+    for post_id, pub_date in new_posts.values_list(
+        'id', 'pub_date'
+    ).iterator(chunk_size=batch_size):
+        post_ids.append(post_id)
+        post_dates.append(pub_date.timestamp())
+    limit = now.timestamp()
+
+    def make_comment():
+        index = int(len(post_ids) * rng.random() ** COMMENT_SKEW)
+        created = min(
+            post_dates[index] + rng.expovariate(1 / BURST_SECONDS), limit
+        )
+        return Comment(
+            post_id=post_ids[index], author_id=pick(rng, readers, 2),
+            text=text(rng, rng.randint(3, 20)),
+            created=datetime.fromtimestamp(created, tz=timezone.utc)
+        )
+
+    if post_ids:
+        insert(
+            Comment, (make_comment() for _ in range(comments)), batch_size
+        )
+
+    def make_follows():
+        for _ in range(follows):
+            user_id = pick(rng, readers, 2)
+            author_id = pick(rng, authors, FOLLOW_SKEW)
+            if user_id != author_id:
+                yield Follow(user_id=user_id, author_id=author_id)
+
+    if len(user_ids) > 1:
+        insert(Follow, make_follows(), batch_size, ignore_conflicts=True)
+    rebuild_derived()
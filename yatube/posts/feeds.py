@@ -0,0 +1,145 @@
+import heapq
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Post
+from .paginator import keyset_slice
+
+User = get_user_model()
+
+# The number of the newest posts of an author kept in the cache.
+# Deeper pages of the feed are read from the database.
+RECENT_LIMIT = 200
+RECENT_TIMEOUT = 60 * 60 * 24
+BATCH_SIZE = 1000
+# The number of the authors whose lists are read by one query, below
+# the limit of SQLite on the number of the parts of a compound query.
+AUTHORS_PER_QUERY = 100
+
+
+def _key(author_id):
+    return f'recent_posts:{author_id}'
+
+
+def _read_recent_posts(author_ids):
+    """The function reads the lists of the newest posts of the authors
+    from the database, one query for up to AUTHORS_PER_QUERY authors.
+    Every author is read by its own limited range of the index."""
+    recent = {author_id: [] for author_id in author_ids}
+    table = Post._meta.db_table
+    part = (
+        f'SELECT * FROM (SELECT id, author_id, pub_date FROM {table} '
+        f'WHERE author_id = %s ORDER BY pub_date DESC, id DESC LIMIT %s)'
+    )
+    author_ids = list(recent)
+    for start in range(0, len(author_ids), AUTHORS_PER_QUERY):
+        batch = author_ids[start:start + AUTHORS_PER_QUERY]
+        params = []
+        for author_id in batch:
+            params += [author_id, RECENT_LIMIT]
+        posts = Post.objects.raw(
+            ' UNION ALL '.join([part] * len(batch)), params
+        )
+        for post in posts:
+            recent[post.author_id].append((post.pub_date, post.id))
+    return recent
+
+
+def recent_posts(author_ids):
+    """The function returns the lists of the (pub_date, id) keys of the
+    newest posts of the authors, newest first. The lists are read from
+    the cache at once, the missing ones are read from the database."""
+    keys = {_key(author_id): author_id for author_id in author_ids}
+    found = cache.get_many(keys)
+    missing = _read_recent_posts(
+        author_id for key, author_id in keys.items() if key not in found
+    )
+    if missing:
+        cache.set_many({
+            _key(author_id): items for author_id, items in missing.items()
+        }, RECENT_TIMEOUT)
+    return [
+        found[key] if key in found else missing[author_id]
+        for key, author_id in keys.items()
+    ]
+
+
+def _split(items, cursor, newer):
+    """The function returns the part of the newest-first list lying on
+    the requested side of the cursor, in the order of reading."""
+    if cursor is None:
+        return items
+    low, high = 0, len(items)
+    while low < high:
+        middle = (low + high) // 2
+        if items[middle] > cursor or (not newer and items[middle] == cursor):
+            low = middle + 1
+        else:
+            high = middle
+    if newer:
+        return items[low - 1::-1] if low else []
+    return items[low:]
+
+
+def merge(sources, newer=False):
+    """The function merges the lists of keys, each in the order of
+    reading, with a heap. The keys are produced lazily, so only the keys
+    up to the end of the page are compared. Keys present in several
+    lists are returned once."""
+    previous = None
+    for key in heapq.merge(*sources, reverse=not newer):
+        if key != previous:
+            yield key
+        previous = key
+
+
+def author_posts(author_ids, limit, offset=0, cursor=None, newer=False):
+    """The function returns the (pub_date, id) keys of the page of the
+    posts of the authors. The page is merged from the cached lists, so
+    its cost depends on its size and not on the number of the posts.
+    If a list is too short for the page, the page is read from the
+    database."""
+    sources = recent_posts(author_ids)
+    horizon = max(
+        (items[-1] for items in sources if len(items) >= RECENT_LIMIT),
+        default=None
+    )
+    keys = list(islice(
+        merge([_split(items, cursor, newer) for items in sources], newer),
+        offset, offset + limit
+    ))
+    if horizon is None:
+        return keys
+    if newer and cursor >= horizon:
+        return keys
+    if not newer and len(keys) == limit and keys[-1] >= horizon:
+        return keys
+    queryset = Post.objects.filter(author_id__in=author_ids)
+    return list(
+        keyset_slice(queryset, cursor, newer)
+        .values_list('pub_date', 'id')[offset:offset + limit]
+    )
+
+
+def forget(author_id):
+    """The function drops the cached newest posts of the author. It is
+    repeated after the commit, so a list read by a concurrent request
+    before the commit does not stay in the cache."""
+    cache.delete(_key(author_id))
+    transaction.on_commit(lambda: cache.delete(_key(author_id)))
+
+
+def forget_all():
+    """The function drops the cached newest posts of all authors,
+    for the posts written without signals."""
+    author_ids = User.objects.values_list('id', flat=True)
+    batch = []
+    for author_id in author_ids.iterator(chunk_size=BATCH_SIZE):
+        batch.append(_key(author_id))
+        if len(batch) == BATCH_SIZE:
+            cache.delete_many(batch)
+            batch = []
+    cache.delete_many(batch)
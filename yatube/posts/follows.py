@@ -0,0 +1,44 @@
+from django.core.cache import cache
+from django.db import transaction
+
+from .models import Follow
+
+FOLLOWS_TIMEOUT = 60 * 60 * 24
+
+
+def _key(user_id):
+    return f'follows:{user_id}'
+
+
+def followed_author_ids(user):
+    """The function returns the set of the ids of the authors followed
+    by the user. It is kept in the cache until the subscriptions of the
+    user change and on the user object for the rest of the request."""
+    if not user.is_authenticated:
+        return frozenset()
+    ids = getattr(user, '_followed_author_ids', None)
+    if ids is None:
+        ids = cache.get(_key(user.pk))
+    if ids is None:
+        ids = frozenset(
+            Follow.objects.filter(user_id=user.pk).values_list(
+                'author_id', flat=True
+            )
+        )
+        cache.set(_key(user.pk), ids, FOLLOWS_TIMEOUT)
+    user._followed_author_ids = ids
+    return ids
+
+
+def following(user, author_ids):
+    """The function returns the ids of the given authors followed by
+    the user, reading the cache once for any number of authors."""
+    return followed_author_ids(user) & set(author_ids)
+
+
+def forget(user_id):
+    """The function drops the cached subscriptions of the user. It is
+    repeated after the commit, so a set read by a concurrent request
+    before the commit does not stay in the cache."""
+    cache.delete(_key(user_id))
+    transaction.on_commit(lambda: cache.delete(_key(user_id)))
@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from .images import process_upload
 from .models import Post, Comment
 
 
@@ -14,6 +16,18 @@ class PostForm(forms.ModelForm):
             'image': 'Неплохо бы и картинку добавить!',
         }
 
+    def clean_image(self):
+        """The function passes a new image through the upload pipeline
+        and remembers its size in the post."""
+        image = self.cleaned_data.get('image')
+        if isinstance(image, UploadedFile):
+            image, width, height = process_upload(image)
+            self.instance.image_width = width
+            self.instance.image_height = height
+        elif not image:
+            self.instance.image_width = self.instance.image_height = None
+        return image
+
 
 class CommentForm(forms.ModelForm):
     """Form for adding a comment."""
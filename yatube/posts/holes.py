@@ -0,0 +1,34 @@
+import base64
+import json
+import re
+
+from django.template.loader import render_to_string
+
+PLACEHOLDER = '<!--hole:{}-->'
+PLACEHOLDER_RE = re.compile(r'<!--hole:([A-Za-z0-9_=-]+)-->')
+
+
+def placeholder(template_name, values):
+    """The function returns the mark left in the page in place of the
+    viewer-dependent template rendered with the values."""
+    raw = json.dumps([template_name, values], ensure_ascii=False)
+    return PLACEHOLDER.format(
+        base64.urlsafe_b64encode(raw.encode()).decode()
+    )
+
+
+def render_hole(request, template_name, values):
+    """The function renders the viewer-dependent template for the
+    viewer of the request."""
+    return render_to_string(template_name, values, request=request)
+
+
+def fill(content, request):
+    """The function replaces the marks left in the page with the
+    templates rendered for the viewer of the request."""
+    def replace(match):
+        template_name, values = json.loads(
+            base64.urlsafe_b64decode(match.group(1)).decode()
+        )
+        return render_hole(request, template_name, values)
+    return PLACEHOLDER_RE.sub(replace, content)
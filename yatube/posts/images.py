@@ -0,0 +1,43 @@
+import os
+import tempfile
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from PIL import Image, ImageOps
+
+MAX_SIDE = 2048
+MAX_PIXELS = 50_000_000
+OUTPUT_FORMAT = 'WEBP'
+OUTPUT_EXTENSION = '.webp'
+QUALITY = 85
+
+
+def process_upload(upload):
+    """The function normalizes the uploaded image: applies the EXIF
+    orientation, caps the size, drops the metadata and re-encodes the
+    picture to WEBP. Returns the new file with its width and height."""
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+        if image.width * image.height > MAX_PIXELS:
+            raise ValidationError('Слишком большое изображение.')
+        # JPEG is decoded right at the reduced scale, which is much
+        # cheaper than decoding the whole picture and resizing it.
+        image.draft('RGB', (MAX_SIDE, MAX_SIDE))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((MAX_SIDE, MAX_SIDE), Image.LANCZOS)
+    except (OSError, Image.DecompressionBombError) as error:
+        raise ValidationError('Не удалось обработать изображение.') from error
+    if image.mode not in ('RGB', 'RGBA'):
+        has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+    # The result goes to disk as soon as it outgrows the upload buffer.
+    output = tempfile.SpooledTemporaryFile(
+        max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE
+    )
+    image.save(output, OUTPUT_FORMAT, quality=QUALITY, method=4)
+    output.seek(0)
+    name = os.path.splitext(os.path.basename(upload.name))[0]
+    output = File(output, name=name + OUTPUT_EXTENSION)
+    return output, image.width, image.height
@@ -0,0 +1,140 @@
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+from yatube.sqlite import PRODUCTION_PRAGMAS, apply_pragmas
+
+PROFILES = {
+    'default': {},
+    'production': PRODUCTION_PRAGMAS,
+}
+SEED_ROWS = 10000
+
+
+def _connect(path, pragmas):
+    # The same connection settings Django uses for sqlite3.
+    db = sqlite3.connect(path, isolation_level=None)
+    apply_pragmas(db.cursor(), pragmas)
+    return db
+
+
+def _seed(path, pragmas):
+    db = _connect(path, pragmas)
+    db.execute(
+        'CREATE TABLE post (id INTEGER PRIMARY KEY, author INTEGER, '
+        'text TEXT, pub_date REAL)'
+    )
+    db.execute('CREATE INDEX post_pub_date ON post (pub_date)')
+    db.execute('BEGIN')
+    db.executemany(
+        'INSERT INTO post (author, text, pub_date) VALUES (?, ?, ?)',
+        ((n % 100, 'Текст поста ' * 20, n) for n in range(SEED_ROWS))
+    )
+    db.execute('COMMIT')
+    db.close()
+
+
+def _reader(path, pragmas, deadline, results):
+    db = _connect(path, pragmas)
+    done = errors = 0
+    while time.monotonic() < deadline:
+        try:
+            db.execute(
+                'SELECT id, author, text FROM post '
+                'ORDER BY pub_date DESC LIMIT 10'
+            ).fetchall()
+            db.execute('SELECT COUNT(*) FROM post').fetchone()
+            done += 1
+        except sqlite3.OperationalError:
+            errors += 1
+    results.put(('read', done, errors))
+
+
+def _writer(path, pragmas, deadline, results):
+    db = _connect(path, pragmas)
+    done = errors = 0
+    while time.monotonic() < deadline:
+        try:
+            db.execute('BEGIN IMMEDIATE')
+            db.execute(
+                'INSERT INTO post (author, text, pub_date) VALUES (?, ?, ?)',
+                (done % 100, 'Новый пост', time.time())
+            )
+            db.execute('COMMIT')
+            done += 1
+        except sqlite3.OperationalError:
+            if db.in_transaction:
+                db.execute('ROLLBACK')
+            errors += 1
+    results.put(('write', done, errors))
+
+
+def run_profile(pragmas, readers, writers, duration):
+    """The function loads a fresh database with parallel readers and
+    writers and returns the numbers of done and failed operations."""
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'bench.sqlite3')
+        _seed(path, pragmas)
+        results = multiprocessing.Queue()
+        deadline = time.monotonic() + duration
+        workers = [
+            multiprocessing.Process(
+                target=target, args=(path, pragmas, deadline, results)
+            )
+            for target, count in ((_reader, readers), (_writer, writers))
+            for _ in range(count)
+        ]
+        for worker in workers:
+            worker.start()
+        totals = {'read': [0, 0], 'write': [0, 0]}
+        for _ in workers:
+            kind, done, errors = results.get()
+            totals[kind][0] += done
+            totals[kind][1] += errors
+        for worker in workers:
+            worker.join()
+    return totals
+
+
+class Command(BaseCommand):
+    """The command compares the concurrency of SQLite with the default
+    and the production pragmas."""
+    help = (
+        'Сравнивает пропускную способность SQLite при параллельных '
+        'чтениях и записях с настройками по умолчанию и продакшена.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--readers', type=int, default=4,
+            help='Количество читающих процессов.'
+        )
+        parser.add_argument(
+            '--writers', type=int, default=2,
+            help='Количество пишущих процессов.'
+        )
+        parser.add_argument(
+            '--duration', type=float, default=5.0,
+            help='Длительность каждого замера в секундах.'
+        )
+
+    def handle(self, *args, **options):
+        duration = options['duration']
+        self.stdout.write(
+            f'{"профиль":<12}{"чтений/с":>12}{"записей/с":>12}'
+            f'{"ошибок":>10}'
+        )
+        for name, pragmas in PROFILES.items():
+            totals = run_profile(
+                pragmas, options['readers'], options['writers'], duration
+            )
+            reads, read_errors = totals['read']
+            writes, write_errors = totals['write']
+            self.stdout.write(
+                f'{name:<12}{reads / duration:>12.0f}'
+                f'{writes / duration:>12.0f}'
+                f'{read_errors + write_errors:>10}'
+            )
@@ -0,0 +1,279 @@
+import json
+import os
+import random
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import django
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from yatube.metrics import registry
+
+from posts import dataset
+from posts.models import Group, Post, TimelineEntry
+
+User = get_user_model()
+
+SAMPLE_SIZE = 1000
+
+
+def percentile(values, fraction):
+    """The function returns the value below which the given fraction
+    of the sorted values lies."""
+    if not values:
+        return None
+    index = min(int(round(fraction * (len(values) - 1))), len(values) - 1)
+    return values[index]
+
+
+class Targets:
+    """Random addresses and data of the requests of every view."""
+    def __init__(self, rng):
+        self.rng = rng
+        self.users = list(
+            User.objects.order_by('?').values_list('username', flat=True)[
+                :SAMPLE_SIZE
+            ]
+        )
+        self.groups = list(Group.objects.values_list('slug', flat=True))
+        self.posts = list(
+            Post.objects.order_by('?').values_list(
+                'author__username', 'id'
+            )[:SAMPLE_SIZE]
+        )
+
+    def index(self):
+        return 'get', reverse('index'), None
+
+    def group_posts(self):
+        slug = self.rng.choice(self.groups)
+        return 'get', reverse('group_posts', args=[slug]), None
+
+    def profile(self):
+        username = self.rng.choice(self.users)
+        return 'get', reverse('profile', args=[username]), None
+
+    def post_view(self):
+        url = reverse('post_view', args=self.rng.choice(self.posts))
+        return 'get', url, None
+
+    def follow_index(self):
+        return 'get', reverse('follow_index'), None
+
+    def add_comment(self):
+        url = reverse('add_comment', args=self.rng.choice(self.posts))
+        return 'post', url, {'text': 'Комментарий из бенчмарка'}
+
+    def new_post(self):
+        return 'post', reverse('new_post'), {'text': 'Пост из бенчмарка'}
+
+
+VIEWS = (
+    'index', 'group_posts', 'profile', 'post_view', 'follow_index',
+    'add_comment', 'new_post',
+)
+
+
+def drive(targets, view, requests, concurrency, warmup):
+    """The function sends the requests to the view from parallel clients
+    logged in as random users and returns the latencies of the answers,
+    the number of errors and the total time."""
+    make_request = getattr(targets, view)
+    lock = threading.Lock()
+    queue = list(range(requests))
+    latencies, errors = [], []
+
+    def worker():
+        client = Client()
+        with lock:
+            username = targets.rng.choice(targets.users)
+        client.force_login(User.objects.get(username=username))
+        for _ in range(warmup):
+            with lock:
+                method, url, data = make_request()
+            getattr(client, method)(url, data)
+        barrier.wait()
+        while True:
+            with lock:
+                if not queue:
+                    break
+                queue.pop()
+                method, url, data = make_request()
+            start = time.perf_counter()
+            response = getattr(client, method)(url, data)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if response.status_code >= 400:
+                    errors.append(response.status_code)
+        connections.close_all()
+
+    barrier = threading.Barrier(concurrency + 1)
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    barrier.wait()
+    registry.clear()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.join()
+    return sorted(latencies), len(errors), time.perf_counter() - start
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            stderr=subprocess.DEVNULL, cwd=settings.BASE_DIR
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    """The command measures the latency and the throughput of the posts
+    views on a generated dataset in a separate database."""
+    help = (
+        'Заполняет временную базу данными и измеряет задержки, пропускную '
+        'способность и число запросов к базе для страниц постов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=20)
+        parser.add_argument('--posts', type=int, default=50000)
+        parser.add_argument('--comments', type=int, default=100000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--concurrency', type=int, default=8,
+            help='Количество параллельных клиентов.'
+        )
+        parser.add_argument(
+            '--requests', type=int, default=500,
+            help='Количество замеряемых запросов к каждой странице.'
+        )
+        parser.add_argument(
+            '--warmup', type=int, default=5,
+            help='Количество незамеряемых запросов каждого клиента.'
+        )
+        parser.add_argument(
+            '--views', nargs='+', choices=VIEWS, default=VIEWS,
+            help='Замеряемые страницы.'
+        )
+        parser.add_argument(
+            '--output', help='Файл JSON для сохранения результатов.'
+        )
+        parser.add_argument(
+            '--compare', help='Файл JSON с результатами для сравнения.'
+        )
+
+    def handle(self, *args, **options):
+        directory = tempfile.mkdtemp()
+        connection.settings_dict['TEST'] = {
+            'NAME': os.path.join(directory, 'benchmark.sqlite3')
+        }
+        # The cache and the metrics of the site are not touched: the
+        # cache of the run lives in its directory. The debug toolbar and
+        # the query log do not distort the timings.
+        isolated = override_settings(
+            DEBUG=False,
+            CACHES={'default': {
+                **settings.CACHES['default'],
+                'LOCATION': os.path.join(directory, 'cache.sqlite3'),
+            }},
+            METRICS_LOCATION=None,
+        )
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            with isolated:
+                results = self.run(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            shutil.rmtree(directory)
+        self.report(results, options['compare'])
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, ensure_ascii=False, indent=2)
+
+    def run(self, options):
+        sizes = {
+            name: options[name]
+            for name in ('users', 'groups', 'posts', 'comments', 'follows')
+        }
+        self.stderr.write('Заполнение базы...')
+        start = time.perf_counter()
+        dataset.generate(seed=options['seed'], **sizes)
+        seeding = time.perf_counter() - start
+        targets = Targets(random.Random(options['seed']))
+        results = {
+            'revision': git_revision(),
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'django': django.get_version(),
+            'settings': os.environ.get('DJANGO_SETTINGS_MODULE'),
+            'dataset': {**sizes, 'seed': options['seed']},
+            'seeding_seconds': round(seeding, 1),
+            'timeline_rows': TimelineEntry.objects.count(),
+            'concurrency': options['concurrency'],
+            'views': {},
+        }
+        for view in options['views']:
+            self.stderr.write(f'Замер {view}...')
+            latencies, errors, elapsed = drive(
+                targets, view, options['requests'],
+                options['concurrency'], options['warmup']
+            )
+            samples = registry.samples()
+            count = samples.get(('yatube_request_db_queries_count', view, ''))
+            queries = samples.get(('yatube_request_db_queries_sum', view, ''))
+            results['views'][view] = {
+                'requests': len(latencies),
+                'errors': errors,
+                'throughput': round(len(latencies) / elapsed, 1),
+                'p50_ms': round(percentile(latencies, 0.50) * 1000, 2),
+                'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+                'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+                'queries_per_request': (
+                    round(queries / count, 1) if count else None
+                ),
+            }
+        return results
+
+    def report(self, results, compare):
+        previous = {}
+        if compare:
+            with open(compare) as source:
+                previous = json.load(source)['views']
+        self.stdout.write(
+            f'Заполнение базы: {results["seeding_seconds"]} с, '
+            f'записей лент: {results["timeline_rows"]}'
+        )
+        self.stdout.write(
+            f'{"страница":<14}{"зап/с":>9}{"p50 мс":>9}{"p95 мс":>9}'
+            f'{"p99 мс":>9}{"SQL":>7}{"ошибки":>8}'
+        )
+        for view, row in results['views'].items():
+            self.stdout.write(
+                f'{view:<14}{row["throughput"]:>9}{row["p50_ms"]:>9}'
+                f'{row["p95_ms"]:>9}{row["p99_ms"]:>9}'
+                f'{row["queries_per_request"] or "-":>7}{row["errors"]:>8}'
+            )
+            old = previous.get(view)
+            if old:
+                self.stdout.write(
+                    f'{"  было":<14}{old["throughput"]:>9}{old["p50_ms"]:>9}'
+                    f'{old["p95_ms"]:>9}{old["p99_ms"]:>9}'
+                    f'{old["queries_per_request"] or "-":>7}'
+                    f'{old["errors"]:>8}'
+                )
@@ -0,0 +1,62 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import transfer
+
+
+class Command(BaseCommand):
+    """The command streams the groups, posts, comments and subscriptions
+    to a JSON Lines file."""
+    help = (
+        'Выгружает группы, посты, комментарии и подписки в файл JSON Lines '
+        '(со сжатием gzip, если имя файла оканчивается на .gz).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу выгрузки.')
+        parser.add_argument(
+            '--chunk-size', type=int, default=transfer.CHUNK_SIZE,
+            help='Количество записей, читаемых из базы за один запрос.'
+        )
+        parser.add_argument(
+            '--resume', action='store_true',
+            help='Продолжить прерванную выгрузку с последней записи файла.'
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        after = None
+        if options['resume']:
+            if path.endswith('.gz'):
+                transfer.drop_partial_gzip(path)
+            else:
+                self.drop_partial_line(path)
+            after = transfer.last_row(path)
+        elif os.path.exists(path):
+            raise CommandError(
+                f'Файл {path} уже существует, используйте --resume.'
+            )
+        with transfer.open_file(path, 'a') as output:
+            total = transfer.export(output, after, options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(f'Выгружено записей: {total}'))
+
+    def drop_partial_line(self, path):
+        """The function cuts off the line the interrupted export
+        did not finish."""
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb+') as output:
+            output.seek(0, os.SEEK_END)
+            end = position = output.tell()
+            while position > 0:
+                step = min(position, 65536)
+                output.seek(position - step)
+                chunk = output.read(step)
+                newline = chunk.rfind(b'\n')
+                if newline != -1:
+                    position = position - step + newline + 1
+                    break
+                position -= step
+            if position != end:
+                output.truncate(position)
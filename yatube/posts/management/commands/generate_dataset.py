@@ -0,0 +1,49 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import dataset
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+
+
+class Command(BaseCommand):
+    """The command fills the database with generated data of the shape
+    of the production database."""
+    help = (
+        'Заполняет базу пользователями, группами, постами, комментариями '
+        'и подписками со степенным распределением популярности.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--size', type=int, default=100000,
+            help='Общее количество создаваемых записей.'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Начальное значение генератора случайных чисел.'
+        )
+        parser.add_argument(
+            '--days', type=int, default=365,
+            help='За сколько дней создаются посты.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=dataset.BATCH_SIZE,
+            help='Количество записей, сохраняемых за одну транзакцию.'
+        )
+
+    def handle(self, *args, **options):
+        sizes = dataset.sizes(options['size'])
+        start = time.perf_counter()
+        dataset.generate(
+            seed=options['seed'], days=options['days'],
+            batch_size=options['batch_size'], **sizes
+        )
+        elapsed = time.perf_counter() - start
+        for model in (Group, Post, Comment, Follow, TimelineEntry):
+            self.stdout.write(
+                f'{model._meta.verbose_name_plural}: {model.objects.count()}'
+            )
+        self.stdout.write(
+            self.style.SUCCESS(f'Готово за {elapsed:.0f} с.')
+        )
@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from posts import dataset, transfer
+
+
+class Command(BaseCommand):
+    """The command loads the groups, posts, comments and subscriptions
+    from a JSON Lines file made by export_posts."""
+    help = (
+        'Загружает группы, посты, комментарии и подписки из файла '
+        'JSON Lines, созданного командой export_posts.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу выгрузки.')
+        parser.add_argument(
+            '--offset', type=int, default=0,
+            help='Количество уже загруженных строк файла, они пропускаются.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=transfer.CHUNK_SIZE,
+            help='Количество записей, сохраняемых за одну транзакцию.'
+        )
+
+    def handle(self, *args, **options):
+        saved = options['offset']
+
+        def progress(number):
+            nonlocal saved
+            saved = number
+            if options['verbosity'] > 1:
+                self.stdout.write(f'Загружено строк: {number}')
+
+        try:
+            with transfer.open_file(options['path'], 'r') as lines:
+                total = transfer.load(
+                    lines, options['offset'], options['batch_size'],
+                    progress
+                )
+        except IntegrityError as error:
+            raise CommandError(
+                f'Строки после {saved}-й конфликтуют с данными базы '
+                f'({error}). Загруженные строки можно пропустить '
+                f'с --offset {saved}.'
+            )
+        dataset.rebuild_derived()
+        self.stdout.write(self.style.SUCCESS(f'Прочитано строк: {total}'))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from posts.counters import recount_all, recount_feeds
+
+
+class Command(BaseCommand):
+    """The command recomputes the counters of the authors
+    and the feeds to repair drift."""
+    help = 'Пересчитывает счётчики записей и подписок авторов и лент.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Количество авторов, пересчитываемых за один запрос.'
+        )
+
+    def handle(self, *args, **options):
+        total = recount_all(options['batch_size'])
+        feeds = recount_feeds()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Пересчитано авторов: {total}, лент: {feeds}'
+            )
+        )
@@ -0,0 +1,114 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.urls import resolve
+from django.utils.cache import get_conditional_response, quote_etag
+
+from . import holes
+from .caching import (LOCK_TIMEOUT, acquire, changes, get_generations,
+                      release)
+
+# The cookie of the visitor who has just changed something. Outdated
+# pages are not served to them while it lasts, so they see their change.
+WRITER_COOKIE = 'page_cache_writer'
+
+
+def page_key(request):
+    """The function builds the cache key of the page from its path
+    and query string."""
+    path = request.get_full_path().encode()
+    return 'page:' + hashlib.md5(path).hexdigest()
+
+
+class PageCacheMiddleware:
+    """Middleware caching whole pages once for all viewers.
+
+    While the cache is on, the viewer-dependent parts of the pages
+    ({% hole %}) are rendered as marks, so the page is the same for
+    everyone. Such a page is cached if its view told the scopes it
+    depends on (see page_etag). It is kept with the versions of the
+    scopes and served while they are current: saving a post, a comment,
+    a group or a subscription moves the versions of the scopes it
+    touches, so only the pages showing the change are rendered again.
+    While one request renders the page, the others get the outdated
+    one, except the visitors who have just changed something.
+    The marks are filled in for the viewer of every response.
+    The cache is off while PAGE_CACHE_TIMEOUT is 0.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.PAGE_CACHE_TIMEOUT:
+            return self.get_response(request)
+        before = changes()
+        response = self.cached_or_rendered(request)
+        if changes() != before:
+            response.set_cookie(
+                WRITER_COOKIE, '1', max_age=LOCK_TIMEOUT, httponly=True,
+                samesite='Lax'
+            )
+        return response
+
+    def cached_or_rendered(self, request):
+        if request.method != 'GET':
+            return self.get_response(request)
+        request.punch_holes = True
+        key = page_key(request)
+        entry = cache.get(key)
+        locked = False
+        if entry is not None:
+            scopes, generations = entry[:2]
+            current = get_generations(scopes) == generations
+            if not current:
+                locked = acquire(key)
+            writer = WRITER_COOKIE in request.COOKIES
+            if current or not (locked or writer):
+                response = self.viewer_response(
+                    request, self.cached_response(request, entry)
+                )
+                return get_conditional_response(
+                    request, etag=response.get('ETag'), response=response
+                )
+        try:
+            response = self.get_response(request)
+            page_scopes = getattr(request, 'page_scopes', None)
+            if (
+                page_scopes is not None and response.status_code == 200
+                and not response.streaming and not response.cookies
+            ):
+                scopes, generations = page_scopes
+                cache.set(key, (
+                    scopes, generations, response.status_code,
+                    list(response.items()), response.content
+                ), settings.PAGE_CACHE_TIMEOUT)
+        finally:
+            if locked:
+                release(key)
+        return self.viewer_response(request, response)
+
+    def cached_response(self, request, entry):
+        _, _, status, headers, content = entry
+        request.resolver_match = resolve(request.path_info)
+        response = HttpResponse(content, status=status)
+        for header, value in headers:
+            response[header] = value
+        return response
+
+    def viewer_response(self, request, response):
+        """The function fills the marks of the page in for the viewer.
+        The validator of the page is made different for every viewer."""
+        if response.streaming or not response.get(
+            'Content-Type', ''
+        ).startswith('text/html'):
+            return response
+        content = response.content.decode(response.charset)
+        response.content = holes.fill(content, request)
+        if response.has_header('ETag'):
+            raw = f'{response["ETag"]}|{request.user.pk}'
+            response['ETag'] = quote_etag(
+                hashlib.md5(raw.encode()).hexdigest()
+            )
+        return response
@@ -0,0 +1,79 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:08
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_timelines(apps, schema_editor):
+    """The function fills the timelines from the existing subscriptions,
+    like posts.timeline.rebuild does, so the favourites feeds are not
+    empty after the migration."""
+    Follow = apps.get_model('posts', 'Follow')
+    Post = apps.get_model('posts', 'Post')
+    PopularAuthor = apps.get_model('posts', 'PopularAuthor')
+    TimelineEntry = apps.get_model('posts', 'TimelineEntry')
+    popular = Follow.objects.values('author_id').annotate(
+        followers=models.Count('id')
+    ).filter(followers__gte=settings.TIMELINE_FANOUT_LIMIT)
+    PopularAuthor.objects.bulk_create(
+        PopularAuthor(author_id=row['author_id']) for row in popular
+    )
+    schema_editor.execute(
+        f'INSERT INTO {TimelineEntry._meta.db_table} (user_id, author_id, '
+        f'post_id, pub_date) SELECT user_id, author_id, post_id, pub_date '
+        f'FROM (SELECT follow.user_id, post.author_id, post.id AS post_id, '
+        f'post.pub_date, ROW_NUMBER() OVER (PARTITION BY follow.user_id '
+        f'ORDER BY post.pub_date DESC, post.id DESC) AS position '
+        f'FROM {Follow._meta.db_table} follow '
+        f'JOIN {Post._meta.db_table} post '
+        f'ON post.author_id = follow.author_id '
+        f'WHERE follow.author_id NOT IN '
+        f'(SELECT author_id FROM {PopularAuthor._meta.db_table})) '
+        f'WHERE position <= %s',
+        [settings.TIMELINE_DEPTH]
+    )
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('posts', '0019_auto_20210514_1106'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TimelineEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pub_date', models.DateTimeField(verbose_name='Дата публикации')),
+                ('author', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline_entries', to='posts.Post', verbose_name='Пост')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='timeline', to=settings.AUTH_USER_MODEL, verbose_name='Подписчик')),
+            ],
+            options={
+                'verbose_name': 'Запись ленты',
+                'verbose_name_plural': 'Записи ленты',
+            },
+        ),
+        migrations.CreateModel(
+            name='PopularAuthor',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('author', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='popular', to=settings.AUTH_USER_MODEL, verbose_name='Автор')),
+            ],
+            options={
+                'verbose_name': 'Популярный автор',
+                'verbose_name_plural': 'Популярные авторы',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='timelineentry',
+            index=models.Index(fields=['user', 'pub_date', 'post'], name='timeline_user_pub_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='timelineentry',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_timeline_post'),
+        ),
+        migrations.RunPython(fill_timelines, migrations.RunPython.noop),
+    ]
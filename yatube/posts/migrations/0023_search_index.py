@@ -0,0 +1,35 @@
+# Generated by Django 2.2.28 on 2026-10-18 04:20
+
+from django.db import migrations
+
+TABLES = (
+    ('posts_post_fts', 'posts_post'),
+    ('posts_comment_fts', 'posts_comment'),
+)
+
+
+def create_search_index(apps, schema_editor):
+    for table, source in TABLES:
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {table} USING fts5('
+            f"text, tokenize = 'unicode61 remove_diacritics 2')"
+        )
+        schema_editor.execute(
+            f'INSERT INTO {table} (rowid, text) SELECT id, text FROM {source}'
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    for table, _ in TABLES:
+        schema_editor.execute(f'DROP TABLE {table}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0022_post_updated'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
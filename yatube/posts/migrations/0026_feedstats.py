@@ -0,0 +1,25 @@
+# Generated by Django 2.2.28 on 2026-10-18 03:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0025_comment_post_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedStats',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(max_length=50, unique=True, verbose_name='Лента')),
+                ('posts_count', models.PositiveIntegerField(default=0, verbose_name='Записей')),
+            ],
+            options={
+                'verbose_name': 'Статистика ленты',
+                'verbose_name_plural': 'Статистика лент',
+            },
+        ),
+    ]
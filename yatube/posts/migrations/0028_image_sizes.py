@@ -0,0 +1,55 @@
+# Generated by Django 2.2.28 on 2026-10-18 04:49
+
+from django.core.files.storage import default_storage
+from django.db import migrations
+from PIL import Image
+
+BATCH_SIZE = 1000
+ORIENTATION = 0x0112
+# The EXIF orientations turning the picture by 90 degrees.
+TURNED = {5, 6, 7, 8}
+
+
+def image_size(name):
+    """The function reads the size of the stored image as it is shown,
+    from the header of the file only. Returns None if the file can not
+    be read."""
+    try:
+        with default_storage.open(name) as file, Image.open(file) as image:
+            width, height = image.size
+            if image.getexif().get(ORIENTATION) in TURNED:
+                width, height = height, width
+    except OSError:
+        return None
+    return width, height
+
+
+def fill_image_sizes(apps, schema_editor):
+    """The function stores the sizes of the images uploaded before
+    the sizes were kept in the posts."""
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.exclude(image__isnull=True).exclude(image='').filter(
+        image_width__isnull=True
+    ).only('id', 'image')
+    batch = []
+    for post in posts.iterator(chunk_size=BATCH_SIZE):
+        size = image_size(post.image.name)
+        if size is None:
+            continue
+        post.image_width, post.image_height = size
+        batch.append(post)
+        if len(batch) == BATCH_SIZE:
+            Post.objects.bulk_update(batch, ['image_width', 'image_height'])
+            batch = []
+    Post.objects.bulk_update(batch, ['image_width', 'image_height'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0027_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_image_sizes, migrations.RunPython.noop),
+    ]
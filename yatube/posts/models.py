@@ -1,9 +1,26 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
 User = get_user_model()
 
 
+class PostQuerySet(models.QuerySet):
+    """Queryset of posts with helpers for rendering feeds."""
+    def for_feed(self):
+        """The function joins the author and the group and counts
+        the comments, so a feed page is rendered without extra queries."""
+        comments = Comment.objects.filter(
+            post=OuterRef('pk')
+        ).order_by().values('post').annotate(total=Count('*'))
+        return self.select_related('author', 'group').annotate(
+            comment_count=Coalesce(
+                Subquery(comments.values('total')), 0
+            )
+        )
+
+
 class Post(models.Model):
     """The model describing the post published by the author."""
     text = models.TextField('Текст')
@@ -12,6 +29,7 @@ class Post(models.Model):
         auto_now_add=True,
         db_index=True
     )
+    updated = models.DateTimeField('Дата изменения', auto_now=True)
     author = models.ForeignKey(
         User, on_delete=models.CASCADE,
         related_name='posts',
@@ -29,9 +47,27 @@ class Post(models.Model):
         blank=True,
         null=True
     )
+    image_width = models.PositiveIntegerField(
+        'Ширина изображения', blank=True, null=True, editable=False
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота изображения', blank=True, null=True, editable=False
+    )
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        indexes = [
+            models.Index(
+                fields=['group', 'pub_date', 'id'],
+                name='post_group_pub_date_idx'
+            ),
+            models.Index(
+                fields=['author', 'pub_date', 'id'],
+                name='post_author_pub_date_idx'
+            ),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -70,6 +106,12 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'
+            ),
+        ]
         verbose_name = 'Комментарий'
         verbose_name_plural = 'Комментарии'
 
@@ -97,5 +139,91 @@ class Follow(models.Model):
                 name='unique_pair'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['author', 'user'], name='follow_author_user_idx'
+            ),
+        ]
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
+
+
+class TimelineEntry(models.Model):
+    """Materialized favourites feed: a post of the followed author
+    delivered to the subscriber at the moment of publication."""
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Подписчик'
+    )
+    author = models.ForeignKey(
+        User, on_delete=models.CASCADE,
+        related_name='+',
+        verbose_name='Автор'
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE,
+        related_name='timeline_entries',
+        verbose_name='Пост'
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_timeline_post'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', 'pub_date', 'post'],
+                name='timeline_user_pub_date_idx'
+            ),
+        ]
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Записи ленты'
+
+
+class PopularAuthor(models.Model):
+    """An author with too many subscribers to fan out posts on write.
+    Their posts are merged into the favourites feed at read time."""
+    author = models.OneToOneField(
+        User, on_delete=models.CASCADE,
+        related_name='popular',
+        verbose_name='Автор'
+    )
+
+    class Meta:
+        verbose_name = 'Популярный автор'
+        verbose_name_plural = 'Популярные авторы'
+
+
+class AuthorStats(models.Model):
+    """Denormalized counters shown on the author's card."""
+    author = models.OneToOneField(
+        User, on_delete=models.CASCADE,
+        related_name='stats',
+        verbose_name='Автор'
+    )
+    posts_count = models.PositiveIntegerField('Записей', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика автора'
+        verbose_name_plural = 'Статистика авторов'
+
+
+class FeedStats(models.Model):
+    """Denormalized number of the posts of a feed: of all posts
+    or of the group's ones."""
+    scope = models.CharField('Лента', max_length=50, unique=True)
+    posts_count = models.PositiveIntegerField('Записей', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика ленты'
+        verbose_name_plural = 'Статистика лент'
+
+    def __str__(self):
+        return self.scope
@@ -0,0 +1,234 @@
+import base64
+import binascii
+import math
+
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+PER_PAGE = 10
+OFFSET_PAGE_LIMIT = 50
+COMMENTS_PER_PAGE = 20
+# Page links shown around the current page and at the ends of the feed.
+ON_EACH_SIDE = 2
+ON_ENDS = 1
+ELLIPSIS = '…'
+
+
+def encode_cursor(obj, number, date_field='pub_date'):
+    """The function packs the position of the object in the feed
+    and the page number into an opaque url-safe token."""
+    date = getattr(obj, date_field)
+    raw = f'{date.isoformat()}|{obj.pk}|{number}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """The function unpacks the token created by encode_cursor.
+    Returns None if the token is damaged."""
+    try:
+        padding = '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(token + padding).decode()
+        pub_date, pk, number = raw.split('|')
+        pub_date = parse_datetime(pub_date)
+        pk, number = int(pk), int(number)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    if pub_date is None or number < 1:
+        return None
+    return pub_date, pk, number
+
+
+def keyset_slice(queryset, cursor=None, newer=False, id_field='id',
+                 date_field='pub_date'):
+    """The function orders the queryset along the feed and keeps
+    the rows lying on the requested side of the (date, id) cursor.
+    Newer rows are returned in ascending order."""
+    op, prefix = ('gt', '') if newer else ('lt', '-')
+    if cursor is not None:
+        date, pk = cursor
+        queryset = queryset.filter(
+            Q(**{f'{date_field}__{op}': date})
+            | Q(**{date_field: date, f'{id_field}__{op}': pk})
+        )
+    return queryset.order_by(f'{prefix}{date_field}', f'{prefix}{id_field}')
+
+
+def elided_page_range(number, num_pages, on_each_side=ON_EACH_SIDE,
+                      on_ends=ON_ENDS):
+    """The function returns the numbers of the pages to link to:
+    the first and the last pages, a window around the current one
+    and ELLIPSIS in place of every skipped run of pages."""
+    if num_pages <= (on_each_side + on_ends) * 2 + 1:
+        return list(range(1, num_pages + 1))
+    numbers = []
+    if number > on_each_side + on_ends + 1:
+        numbers += [*range(1, on_ends + 1), ELLIPSIS]
+        numbers += range(number - on_each_side, number + 1)
+    else:
+        numbers += range(1, number + 1)
+    if number < num_pages - on_each_side - on_ends:
+        numbers += range(number + 1, number + on_each_side + 1)
+        numbers += [ELLIPSIS, *range(num_pages - on_ends + 1, num_pages + 1)]
+    else:
+        numbers += range(number + 1, num_pages + 1)
+    return numbers
+
+
+class KeysetPaginator(Paginator):
+    """Paginator over a feed ordered by (-pub_date, -id).
+    Pages are addressed by the ?after= and ?before= cursors, so every
+    page costs one query limited by the page size and no COUNT(*).
+    Shallow ?page=N links are still served with OFFSET.
+    The optional counter returns the cached or estimated number of the
+    posts and is called only when the page numbers are shown."""
+    def __init__(self, object_list, per_page=PER_PAGE, counter=None,
+                 **kwargs):
+        super().__init__(
+            object_list.order_by('-pub_date', '-id'), per_page, **kwargs
+        )
+        self.counter = counter
+        self.has_more = False
+        self.last_number = 1
+
+    @property
+    def count(self):
+        """The number of the posts given by the counter.
+        Without the counter the posts are counted with COUNT(*)."""
+        if self.counter is not None:
+            return self.counter()
+        return super().count
+
+    @property
+    def num_pages(self):
+        """The number of pages known without counting: the current one
+        and the next one if the look-ahead row was found."""
+        return self.last_number + int(self.has_more)
+
+    def page_numbers(self, page):
+        """The function returns the numbers of the pages to link to from
+        the page. Only the pages served with OFFSET get numbers, deeper
+        pages are reached by the cursors."""
+        if self.counter is None:
+            return []
+        total = max(
+            math.ceil(self.count / self.per_page),
+            page.number + int(self.has_more)
+        )
+        if page.number > OFFSET_PAGE_LIMIT:
+            return []
+        numbers = elided_page_range(
+            page.number, min(total, OFFSET_PAGE_LIMIT)
+        )
+        if total > OFFSET_PAGE_LIMIT:
+            numbers.append(ELLIPSIS)
+        return numbers
+
+    def last_offset_number(self):
+        """The function returns the number of the last page served with
+        OFFSET, by the number of the posts given by the counter."""
+        pages = math.ceil(self.count / self.per_page)
+        return min(max(pages, 1), OFFSET_PAGE_LIMIT)
+
+    def get_page_from_request(self, request):
+        """The function returns the page addressed by the query string.
+        Broken addresses lead to the first page, the numbers past the
+        end of the feed or OFFSET_PAGE_LIMIT lead to the last page."""
+        after = decode_cursor(request.GET.get('after', ''))
+        if after is not None:
+            return self.page_after(*after)
+        before = decode_cursor(request.GET.get('before', ''))
+        if before is not None:
+            return self.page_before(*before)
+        try:
+            number = int(request.GET.get('page', 1))
+        except (TypeError, ValueError):
+            number = 1
+        if number > 1:
+            number = min(number, self.last_offset_number())
+        return self.page_by_number(max(number, 1))
+
+    def fetch(self, limit, offset=0, cursor=None, newer=False):
+        """The function returns the posts of the feed window.
+        Subclasses override it to read the feed from other sources."""
+        queryset = keyset_slice(self.object_list, cursor, newer)
+        return list(queryset[offset:offset + limit])
+
+    def page_by_number(self, number):
+        """The function returns the page by its number using OFFSET.
+        If the counter overestimated the feed and the page is empty,
+        the posts are counted and the last page is returned."""
+        rows = self.fetch(
+            self.per_page + 1, offset=(number - 1) * self.per_page
+        )
+        if not rows and number > 1:
+            number = max(math.ceil(super().count / self.per_page), 1)
+            rows = self.fetch(
+                self.per_page + 1, offset=(number - 1) * self.per_page
+            )
+        self.has_more = len(rows) > self.per_page
+        return self._build_page(rows[:self.per_page], number)
+
+    def page_after(self, pub_date, pk, number):
+        """The function returns the page of posts older than the cursor."""
+        rows = self.fetch(self.per_page + 1, cursor=(pub_date, pk))
+        self.has_more = len(rows) > self.per_page
+        return self._build_page(rows[:self.per_page], number + 1)
+
+    def page_before(self, pub_date, pk, number):
+        """The function returns the page of posts newer than the cursor."""
+        rows = self.fetch(
+            self.per_page + 1, cursor=(pub_date, pk), newer=True
+        )
+        newer_exist = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        number = max(number - 1, 2) if newer_exist else 1
+        self.has_more = True
+        return self._build_page(rows, number)
+
+    def _build_page(self, rows, number):
+        self.last_number = number
+        page = Page(rows, number, self)
+        page.next_cursor = (
+            encode_cursor(rows[-1], number)
+            if self.has_more and rows else None
+        )
+        page.previous_cursor = (
+            encode_cursor(rows[0], number)
+            if number > 1 and rows else None
+        )
+        return page
+
+
+def paginate(request, queryset, per_page=PER_PAGE, counter=None):
+    """The function splits the feed into pages and returns
+    the one requested by the client."""
+    paginator = KeysetPaginator(queryset, per_page, counter)
+    return paginator.get_page_from_request(request)
+
+
+def comments_page(post, cursor=None, per_page=COMMENTS_PER_PAGE):
+    """The function returns the post's comments lying after the cursor,
+    newest first and not more than per_page of them, and the cursor
+    of the next page or None if it is the last one. The first page of
+    a post with counted comments is returned as a queryset, the other
+    pages are read with one extra comment telling that the next page
+    exists."""
+    number = 1
+    queryset = post.comments.select_related('author')
+    if cursor is not None:
+        created, pk, number = cursor
+        cursor = created, pk
+    queryset = keyset_slice(queryset, cursor, date_field='created')
+    comment_count = getattr(post, 'comment_count', None)
+    if cursor is None and comment_count is not None:
+        comments = queryset[:per_page]
+        has_more = comment_count > per_page
+    else:
+        rows = list(queryset[:per_page + 1])
+        comments, has_more = rows[:per_page], len(rows) > per_page
+    next_cursor = (
+        encode_cursor(list(comments)[-1], number + 1, date_field='created')
+        if has_more else None
+    )
+    return comments, next_cursor
@@ -0,0 +1,113 @@
+import base64
+import binascii
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Comment, Post
+
+SEARCH_TABLES = {
+    Post: 'posts_post_fts',
+    Comment: 'posts_comment_fts',
+}
+MAX_TERMS = 10
+
+
+def match_expression(query):
+    """The function turns the user's query into an FTS5 expression:
+    every word is quoted and searched by prefix. Returns an empty string
+    if there are no words in the query."""
+    words = re.findall(r'\w+', query.lower())[:MAX_TERMS]
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+def encode_cursor(rank, pk):
+    """The function packs the position in the search results."""
+    raw = f'{rank!r}|{pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """The function unpacks the search cursor or returns None."""
+    try:
+        padding = '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(token + padding).decode()
+        rank, pk = raw.split('|')
+        return float(rank), int(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+
+
+def index(instance):
+    """The function puts the text of the object into the search index."""
+    table = SEARCH_TABLES[type(instance)]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [instance.pk])
+        cursor.execute(
+            f'INSERT INTO {table} (rowid, text) VALUES (%s, %s)',
+            [instance.pk, instance.text]
+        )
+
+
+def unindex(instance):
+    """The function removes the object from the search index."""
+    table = SEARCH_TABLES[type(instance)]
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table} WHERE rowid = %s', [instance.pk])
+
+
+def rebuild_index(model):
+    """The function fills the search index of the model from scratch,
+    for the rows written without signals."""
+    table = SEARCH_TABLES[model]
+    source = model._meta.db_table
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {table}')
+        cursor.execute(
+            f'INSERT INTO {table} (rowid, text) SELECT id, text FROM {source}'
+        )
+
+
+def ranked_ids(model, query, cursor=None, limit=10):
+    """The function returns up to limit pairs (rank, id) of the best
+    matching objects placed after the cursor. Better matches go first.
+    The index is queried alone and ordered by its rank column, so FTS5
+    sorts the matches itself; equal ranks come in the order of ids."""
+    expression = match_expression(query)
+    if not expression:
+        return []
+    table = SEARCH_TABLES[model]
+    after, params = '', [expression]
+    if cursor is not None:
+        after = 'AND (rank, rowid) > (%s, %s) '
+        params += list(cursor)
+    with connection.cursor() as db_cursor:
+        db_cursor.execute(
+            f'SELECT rank, rowid FROM {table} WHERE {table} MATCH %s '
+            f'{after}ORDER BY rank LIMIT %s',
+            params + [limit]
+        )
+        return db_cursor.fetchall()
+
+
+def filter_queryset(queryset, query):
+    """The function keeps the objects of the queryset matching
+    the query, using the search index instead of LIKE."""
+    table = SEARCH_TABLES[queryset.model]
+    return queryset.filter(pk__in=RawSQL(
+        f'SELECT rowid FROM {table} WHERE {table} MATCH %s',
+        [match_expression(query)]
+    ))
+
+
+def search_posts(query, cursor=None, limit=10):
+    """The function returns the page of found posts in the order
+    of relevance and the cursor of the next page."""
+    ranks = ranked_ids(Post, query, cursor, limit + 1)
+    next_cursor = None
+    if len(ranks) > limit:
+        next_cursor = encode_cursor(*ranks[limit - 1])
+    ids = [pk for _, pk in ranks[:limit]]
+    posts = Post.objects.for_feed().in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts], next_cursor
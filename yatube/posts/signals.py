@@ -0,0 +1,238 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+from django.utils import timezone
+
+from . import counters, feeds, follows, search, timeline
+from .caching import (author_scope, bump_generation, bump_scopes,
+                      group_scope, post_scope, post_scopes)
+from .models import Comment, FeedStats, Follow, Group, Post
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Post)
+def fan_out_post(sender, instance, created, **kwargs):
+    """The function delivers a new post to the subscribers' timelines."""
+    if created:
+        timeline.fan_out(instance)
+
+
+@receiver(post_save, sender=Follow)
+def backfill_timeline(sender, instance, created, **kwargs):
+    """The function fills the timeline of the new subscriber."""
+    if created:
+        timeline.backfill(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def trim_timeline(sender, instance, **kwargs):
+    """The function clears the timeline after unsubscribing."""
+    timeline.trim(instance)
+
+
+@receiver(post_save, sender=Post)
+def count_new_post(sender, instance, created, **kwargs):
+    """The function increments the author's post counter
+    and the counters of the feeds showing the post."""
+    if created:
+        counters.change(instance.author_id, 'posts_count', 1)
+        for scope in counters.feed_scopes(instance.group_id):
+            counters.change_feed(scope, 1)
+
+
+@receiver(post_save, sender=Post)
+def count_moved_post(sender, instance, created, **kwargs):
+    """The function moves the edited post between the groups' counters."""
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if created or previous_group_id == instance.group_id:
+        return
+    if previous_group_id is not None:
+        counters.change_feed(group_scope(previous_group_id), -1)
+    if instance.group_id is not None:
+        counters.change_feed(group_scope(instance.group_id), 1)
+
+
+@receiver(post_delete, sender=Post)
+def count_deleted_post(sender, instance, **kwargs):
+    """The function decrements the author's post counter
+    and the counters of the feeds showing the post."""
+    counters.change(instance.author_id, 'posts_count', -1)
+    for scope in counters.feed_scopes(instance.group_id):
+        counters.change_feed(scope, -1)
+
+
+@receiver(post_delete, sender=Group)
+def forget_group_count(sender, instance, **kwargs):
+    """The function removes the counter of the deleted group."""
+    FeedStats.objects.filter(scope=group_scope(instance.pk)).delete()
+
+
+@receiver(post_save, sender=Follow)
+def count_new_follow(sender, instance, created, **kwargs):
+    """The function increments the subscription counters."""
+    if created:
+        counters.change(instance.author_id, 'followers_count', 1)
+        counters.change(instance.user_id, 'following_count', 1)
+
+
+@receiver(post_delete, sender=Follow)
+def count_deleted_follow(sender, instance, **kwargs):
+    """The function decrements the subscription counters."""
+    counters.change(instance.author_id, 'followers_count', -1)
+    counters.change(instance.user_id, 'following_count', -1)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def invalidate_pages(sender, **kwargs):
+    """The function makes the cached pages outdated after any change
+    of the content shown on them."""
+    bump_generation()
+
+
+@receiver(pre_save, sender=Post)
+def remember_group(sender, instance, **kwargs):
+    """The function remembers the group of the edited post,
+    so the page of the group it leaves is outdated too."""
+    instance._previous_group_id = None
+    if instance.pk is not None:
+        instance._previous_group_id = Post.objects.filter(
+            pk=instance.pk
+        ).order_by().values_list('group_id', flat=True).first()
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+def invalidate_post_scopes(sender, instance, **kwargs):
+    """The function outdates the pages showing the post."""
+    scopes = post_scopes(instance)
+    previous_group_id = getattr(instance, '_previous_group_id', None)
+    if previous_group_id is not None:
+        scopes.append(group_scope(previous_group_id))
+    bump_scopes(*scopes)
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_scopes(sender, instance, **kwargs):
+    """The function outdates the pages showing the commented post."""
+    post = Post.objects.filter(pk=instance.post_id).first()
+    if post is None:
+        bump_scopes(post_scope(instance.post_id))
+    else:
+        bump_scopes(*post_scopes(post))
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidate_group_scopes(sender, instance, **kwargs):
+    """The function outdates the group page and the pages of the authors
+    whose posts show the group. On deletion it runs before the posts
+    are detached from the group."""
+    authors = instance.groups.values_list('author_id', flat=True).distinct()
+    bump_scopes(
+        group_scope(instance.pk), *map(author_scope, authors)
+    )
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def forget_follows(sender, instance, **kwargs):
+    """The function drops the cached subscriptions of the follower."""
+    follows.forget(instance.user_id)
+
+
+@receiver(post_save, sender=Post)
+def forget_recent_posts(sender, instance, created, **kwargs):
+    """The function drops the cached newest posts of the author
+    after a new post."""
+    if created:
+        feeds.forget(instance.author_id)
+
+
+@receiver(post_delete, sender=Post)
+def forget_deleted_post(sender, instance, **kwargs):
+    """The function drops the cached newest posts of the author
+    after a post is deleted."""
+    feeds.forget(instance.author_id)
+
+
+@receiver(post_save, sender=Follow)
+@receiver(post_delete, sender=Follow)
+def invalidate_follow_scopes(sender, instance, **kwargs):
+    """The function outdates the profiles of both sides of the
+    subscription: their counters and the subscription button."""
+    bump_scopes(
+        author_scope(instance.author_id), author_scope(instance.user_id)
+    )
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def touch_group_posts(sender, instance, created=False, **kwargs):
+    """The function outdates the cached cards and the pages of the
+    group's posts after the group is renamed or deleted. On deletion it
+    runs before the posts are detached from the group."""
+    if created:
+        return
+    posts = instance.groups.all()
+    post_ids = list(posts.values_list('id', flat=True))
+    posts.update(updated=timezone.now())
+    bump_scopes(*map(post_scope, post_ids))
+
+
+@receiver(pre_save, sender=User)
+def remember_username(sender, instance, update_fields=None, **kwargs):
+    """The function remembers the username of the edited user,
+    so the posts are touched only when it has changed."""
+    instance._previous_username = None
+    if instance.pk is None:
+        return
+    if update_fields is not None and 'username' not in update_fields:
+        instance._previous_username = instance.username
+        return
+    instance._previous_username = User.objects.filter(
+        pk=instance.pk
+    ).values_list('username', flat=True).first()
+
+
+@receiver(post_save, sender=User)
+def touch_author_posts(sender, instance, created, **kwargs):
+    """The function outdates the cached cards of the author's posts
+    after the username has changed."""
+    previous_username = getattr(instance, '_previous_username', None)
+    if created or previous_username in (None, instance.username):
+        return
+    instance.posts.update(updated=timezone.now())
+    groups = instance.posts.exclude(group=None).values_list(
+        'group_id', flat=True
+    ).distinct()
+    commented = Comment.objects.filter(author=instance).values_list(
+        'post_id', flat=True
+    ).distinct()
+    bump_generation()
+    bump_scopes(
+        author_scope(instance.pk),
+        *map(group_scope, groups),
+        *map(post_scope, commented)
+    )
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Comment)
+def index_text(sender, instance, **kwargs):
+    """The function updates the search index after saving."""
+    search.index(instance)
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Comment)
+def unindex_text(sender, instance, **kwargs):
+    """The function removes the deleted object from the search index."""
+    search.unindex(instance)
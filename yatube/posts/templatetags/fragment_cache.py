@@ -0,0 +1,53 @@
+import hashlib
+
+from django import template
+
+from ..caching import cached_value
+
+register = template.Library()
+
+
+class FragmentNode(template.Node):
+    def __init__(self, nodelist, timeout, name, vary_on, version):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.name = name
+        self.vary_on = vary_on
+        self.version = version
+
+    def render(self, context):
+        vary_on = ':'.join(
+            str(variable.resolve(context)) for variable in self.vary_on
+        )
+        key = 'fragment:{}:{}'.format(
+            self.name, hashlib.md5(vary_on.encode()).hexdigest()
+        )
+        return cached_value(
+            key, lambda: self.nodelist.render(context),
+            self.timeout.resolve(context), self.version.resolve(context)
+        )
+
+
+@register.tag
+def cache_fragment(parser, token):
+    """Caches the contents like the {% cache %} tag, but regenerates
+    them by one request at a time, the others get the outdated contents
+    meanwhile:
+
+        {% cache_fragment 3600 name [vary_on ...] version=generation %}
+        ...
+        {% endcache_fragment %}
+    """
+    nodelist = parser.parse(('endcache_fragment',))
+    parser.delete_first_token()
+    bits = token.split_contents()
+    if len(bits) < 4 or not bits[-1].startswith('version='):
+        raise template.TemplateSyntaxError(
+            f'{bits[0]} tag requires the timeout, the name '
+            'and the version=... argument'
+        )
+    return FragmentNode(
+        nodelist, parser.compile_filter(bits[1]), bits[2],
+        [parser.compile_filter(bit) for bit in bits[3:-1]],
+        parser.compile_filter(bits[-1][len('version='):])
+    )
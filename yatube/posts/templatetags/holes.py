@@ -0,0 +1,31 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..follows import followed_author_ids
+from ..forms import CommentForm
+from ..holes import placeholder, render_hole
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, template_name, **values):
+    """The viewer-dependent part of the page: the template rendered
+    with the values for the viewer. When the page is cached for all
+    viewers, the mark to fill in for each of them."""
+    request = context.get('request')
+    if getattr(request, 'punch_holes', False):
+        return mark_safe(placeholder(template_name, values))
+    return render_hole(request, template_name, values)
+
+
+@register.simple_tag
+def comment_form():
+    """An empty form of the comment."""
+    return CommentForm()
+
+
+@register.simple_tag
+def is_following(user, author_id):
+    """True if the user follows the author."""
+    return author_id in followed_author_ids(user)
@@ -0,0 +1,20 @@
+from django import template
+
+from ..paginator import ELLIPSIS
+
+register = template.Library()
+
+
+@register.simple_tag
+def page_numbers(page):
+    """The numbers of the pages to link to from the page,
+    ELLIPSIS in place of the skipped ones."""
+    if not hasattr(page.paginator, 'page_numbers'):
+        return []
+    return page.paginator.page_numbers(page)
+
+
+@register.filter
+def is_ellipsis(number):
+    """True in place of the skipped pages."""
+    return number == ELLIPSIS
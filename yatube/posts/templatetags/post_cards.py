@@ -0,0 +1,68 @@
+from django import template
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from ..thumbnails import ready_thumbnail
+
+register = template.Library()
+
+CARD_TEMPLATE = 'includes/post_card.html'
+CARD_TIMEOUT = 60 * 60 * 24
+ACTIONS_MARKER = '<!-- viewer-actions -->'
+
+
+def card_key(post, is_post_view):
+    """The function builds the cache key of the post card. It changes
+    whenever the post or the number of its comments changes."""
+    return 'post_card:{}:{}:{}:{:d}'.format(
+        post.pk, post.updated.timestamp(), post.comment_count,
+        bool(is_post_view)
+    )
+
+
+def render_card(post, is_post_view):
+    """The function renders the viewer-independent part of the card
+    split into the parts before and after the viewer's buttons."""
+    html = render_to_string(CARD_TEMPLATE, {
+        'post': post,
+        'is_post_view': is_post_view,
+        'actions_marker': ACTIONS_MARKER,
+    })
+    return tuple(html.split(ACTIONS_MARKER, 1))
+
+
+def get_cards(posts, is_post_view=False):
+    """The function returns the cards of the posts: all of them are read
+    from the cache in one request and only the misses are rendered."""
+    keys = {card_key(post, is_post_view): post for post in posts}
+    cards = cache.get_many(keys)
+    missing = {
+        key: render_card(post, is_post_view)
+        for key, post in keys.items() if key not in cards
+    }
+    if missing:
+        cache.set_many(missing, CARD_TIMEOUT)
+        cards.update(missing)
+    return [
+        (post, tuple(mark_safe(part) for part in cards[key]))
+        for key, post in keys.items()
+    ]
+
+
+@register.simple_tag(takes_context=True)
+def post_cards(context, posts):
+    """Pairs (post, card) for the feed page."""
+    return get_cards(posts, context.get('is_post_view', False))
+
+
+@register.simple_tag(takes_context=True)
+def post_card(context, post):
+    """The card of a single post."""
+    return get_cards([post], context.get('is_post_view', False))[0][1]
+
+
+@register.simple_tag
+def post_thumbnail(post, geometry, **options):
+    """The thumbnail of the post's image or None while it is generated."""
+    return ready_thumbnail(post, geometry, **options)
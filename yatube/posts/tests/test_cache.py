@@ -1,9 +1,523 @@
-from django.core.cache import caches
-from django.test import TestCase
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from yatube.shm_cache import SharedMemoryCache
+
+from ..caching import (acquire, bump_generation, cached_value,
+                       get_generation)
+from ..middleware import WRITER_COOKIE, page_key
+from ..models import Comment, Follow, Group, Post
+
+User = get_user_model()
 
 
 class YatubeCacheTests(TestCase):
     """The class checks if caching is working."""
+    def setUp(self):
+        """Setting the data for testing."""
+        self.guest_client = Client()
+        self.user = User.objects.create(username='vsemikin')
+        self.post = Post.objects.create(text='Старый текст', author=self.user)
+
     def test_cache_object_exist(self):
         """The function checks that the LocMemCache object exists."""
         self.assertIsNotNone(caches['default'])
+
+    def test_index_page_is_cached(self):
+        """The function checks that changes made without signals
+        are not visible until the cache generation changes."""
+        self.guest_client.get(reverse('index'))
+        Post.objects.filter(pk=self.post.pk).update(
+            text='Новый текст', updated=timezone.now()
+        )
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, 'Старый текст')
+        bump_generation()
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, 'Новый текст')
+
+    def test_new_post_is_visible_at_once(self):
+        """The function checks that a new post appears on the cached
+        index page immediately."""
+        self.guest_client.get(reverse('index'))
+        Post.objects.create(text='Свежий пост', author=self.user)
+        response = self.guest_client.get(reverse('index'))
+        self.assertContains(response, 'Свежий пост')
+
+    def test_writes_bump_generation(self):
+        """The function checks that saving and deleting posts, comments
+        and groups changes the cache generation."""
+        writes = (
+            lambda: Group.objects.create(title='Тест', slug='test'),
+            lambda: Comment.objects.create(
+                post=self.post, author=self.user, text='Комментарий'
+            ),
+            lambda: Post.objects.filter(pk=self.post.pk).delete(),
+        )
+        for write in writes:
+            with self.subTest(write=write):
+                generation = get_generation()
+                write()
+                self.assertGreater(get_generation(), generation)
+
+
+class PostCardCacheTests(TestCase):
+    """The class checks the cache of the rendered post cards."""
+    def setUp(self):
+        """Setting the data for testing."""
+        self.author = User.objects.create(username='vsemikin')
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.post = Post.objects.create(
+            text='Старый текст', author=self.author
+        )
+        self.url = reverse('profile', args=[self.author.username])
+
+    def test_card_is_cached_until_post_changes(self):
+        """The function checks that the card is taken from the cache
+        and is rendered again after the post is saved."""
+        self.author_client.get(self.url)
+        Post.objects.filter(pk=self.post.pk).update(text='Новый текст')
+        response = self.author_client.get(self.url)
+        self.assertContains(response, 'Старый текст')
+        self.post.refresh_from_db()
+        self.post.save()
+        response = self.author_client.get(self.url)
+        self.assertContains(response, 'Новый текст')
+
+    def test_deleted_group_is_removed_from_card(self):
+        """The function checks that the cards of the posts stop linking
+        to the deleted group."""
+        group = Group.objects.create(title='Тест', slug='test')
+        self.post.group = group
+        self.post.save()
+        post_url = reverse('post_view', args=['vsemikin', self.post.id])
+        group_url = reverse('group_posts', args=[group.slug])
+        for url in (self.url, post_url):
+            self.assertContains(self.author_client.get(url), group_url)
+        group.delete()
+        for url in (self.url, post_url):
+            with self.subTest(url=url):
+                self.assertNotContains(self.author_client.get(url), group_url)
+
+    def test_only_new_username_touches_posts(self):
+        """The function checks that the posts are outdated after the
+        author is renamed and not after other changes of the user."""
+        updated = self.post.updated
+        generation = get_generation()
+        self.author.set_password('new-password')
+        self.author.save()
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.updated, updated)
+        self.assertEqual(get_generation(), generation)
+        self.author.username = 'semikin'
+        self.author.save()
+        self.post.refresh_from_db()
+        self.assertGreater(self.post.updated, updated)
+        self.assertGreater(get_generation(), generation)
+
+    def test_viewer_buttons_are_not_cached(self):
+        """The function checks that the edit button is shown only
+        to the author of the post."""
+        edit_url = reverse('post_edit', args=['vsemikin', self.post.id])
+        response = self.author_client.get(self.url)
+        self.assertContains(response, edit_url)
+        response = Client().get(self.url)
+        self.assertNotContains(response, edit_url)
+
+    def test_new_comment_updates_card(self):
+        """The function checks that the number of comments on the card
+        changes after commenting."""
+        self.author_client.get(self.url)
+        Comment.objects.create(
+            post=self.post, author=self.author, text='Комментарий'
+        )
+        response = self.author_client.get(self.url)
+        self.assertContains(response, 'Комментариев: 1')
+
+
+class ConditionalGetTests(TestCase):
+    """The class checks the answers to conditional requests."""
+    def setUp(self):
+        """Setting the data for testing."""
+        self.guest_client = Client()
+        self.author = User.objects.create(username='vsemikin')
+        self.reader = User.objects.create(username='reader')
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.group = Group.objects.create(title='Тест', slug='test')
+        self.other_group = Group.objects.create(title='Другая', slug='other')
+        self.post = Post.objects.create(
+            text='Текст', author=self.author, group=self.group
+        )
+        self.urls = {
+            'index': reverse('index'),
+            'group': reverse('group_posts', args=[self.group.slug]),
+            'profile': reverse('profile', args=[self.author.username]),
+            'post': reverse(
+                'post_view', args=[self.author.username, self.post.pk]
+            ),
+        }
+
+    def revalidate(self, client, url):
+        """The function repeats the request with the received ETag
+        and returns the status of the second answer."""
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag).status_code
+
+    def assertFresh(self, name, change, status, client=None):
+        client = client or self.guest_client
+        url = self.urls[name]
+        etag = client.get(url)['ETag']
+        change()
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status)
+
+    def test_unchanged_pages_are_not_modified(self):
+        """The function checks that an unchanged page is answered
+        with 304 for the guest and for the authorized user."""
+        for name, url in self.urls.items():
+            for client in (self.guest_client, self.reader_client):
+                with self.subTest(name=name, client=client):
+                    self.assertEqual(self.revalidate(client, url), 304)
+
+    def test_validator_depends_on_viewer_and_page(self):
+        """The function checks that the validator of one viewer or page
+        does not match the other."""
+        url = self.urls['index']
+        etag = self.guest_client.get(url)['ETag']
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        response = self.guest_client.get(
+            url, {'page': 2}, HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertNotEqual(response.status_code, 304)
+
+    def test_changes_outdate_their_pages_only(self):
+        """The function checks that changes outdate the pages showing
+        them and leave the other pages valid."""
+        def new_post():
+            Post.objects.create(text='Новый', author=self.reader)
+
+        def new_comment():
+            Comment.objects.create(
+                post=self.post, author=self.reader, text='Комментарий'
+            )
+
+        def new_follow():
+            Follow.objects.filter(user=self.reader).delete()
+            Follow.objects.create(user=self.reader, author=self.author)
+
+        def move_post():
+            self.post.group = self.other_group
+            self.post.save()
+
+        cases = (
+            ('index', new_post, 200),
+            ('group', new_post, 304),
+            ('profile', new_post, 304),
+            ('post', new_post, 304),
+            ('group', new_comment, 200),
+            ('post', new_comment, 200),
+            ('profile', new_follow, 200),
+            ('group', new_follow, 304),
+            ('group', move_post, 200),
+        )
+        for name, change, status in cases:
+            with self.subTest(name=name, change=change.__name__):
+                self.assertFresh(name, change, status)
+
+    def test_missing_page_is_not_found(self):
+        """The function checks that a validator is not given to
+        a page that does not exist."""
+        response = self.guest_client.get(
+            reverse('profile', args=['nobody']), HTTP_IF_NONE_MATCH='"x"'
+        )
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(PAGE_CACHE_TIMEOUT=60)
+class PageCacheTests(TestCase):
+    """The class checks the cache of the whole pages."""
+    def setUp(self):
+        """Setting the data for testing."""
+        cache.clear()
+        self.guest_client = Client()
+        self.author = User.objects.create(username='vsemikin')
+        self.other = User.objects.create(username='other')
+        self.group = Group.objects.create(title='Тест', slug='test')
+        self.post = Post.objects.create(
+            text='Текст', author=self.author, group=self.group
+        )
+        Post.objects.create(text='Чужой текст', author=self.other)
+        self.urls = {
+            'index': reverse('index'),
+            'group': reverse('group_posts', args=[self.group.slug]),
+            'profile': reverse('profile', args=[self.author.username]),
+            'other': reverse('profile', args=[self.other.username]),
+            'post': reverse(
+                'post_view', args=[self.author.username, self.post.pk]
+            ),
+        }
+
+    def is_cached(self, url, client=None):
+        """The function requests the page and tells whether it was
+        served without touching the database."""
+        client = client or self.guest_client
+        with CaptureQueriesContext(connection) as context:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return not context.captured_queries
+
+    def test_pages_are_served_from_cache(self):
+        """The function checks that the second request of a page
+        is answered from the cache with the same content."""
+        for name, url in self.urls.items():
+            with self.subTest(name=name):
+                first = self.guest_client.get(url)
+                self.assertTrue(self.is_cached(url))
+                second = self.guest_client.get(url)
+                self.assertEqual(first.content, second.content)
+                response = self.guest_client.get(
+                    url, HTTP_IF_NONE_MATCH=first['ETag']
+                )
+                self.assertEqual(response.status_code, 304)
+
+    def test_changes_purge_affected_pages_only(self):
+        """The function checks that a change renders again only
+        the pages showing it."""
+        def new_comment():
+            Comment.objects.create(
+                post=self.post, author=self.other, text='Комментарий'
+            )
+
+        def new_follow():
+            Follow.objects.create(user=self.other, author=self.author)
+
+        cases = (
+            (new_comment, {'index', 'group', 'profile', 'post'}),
+            (new_follow, {'profile', 'other', 'post'}),
+        )
+        for change, purged in cases:
+            for url in self.urls.values():
+                self.guest_client.get(url)
+            change()
+            for name, url in self.urls.items():
+                with self.subTest(change=change.__name__, name=name):
+                    self.assertEqual(self.is_cached(url), name not in purged)
+
+    def test_outdated_page_is_served_while_rendered(self):
+        """The function checks that while the page is rendered by
+        another request, the outdated page is served."""
+        url = self.urls['post']
+        self.guest_client.get(url)
+        Comment.objects.create(
+            post=self.post, author=self.other, text='Новый комментарий'
+        )
+        acquire(page_key(RequestFactory().get(url)))
+        self.assertTrue(self.is_cached(url))
+        self.assertNotContains(self.guest_client.get(url), 'Новый комментарий')
+
+    def test_writer_is_not_served_outdated_page(self):
+        """The function checks that the visitor who has just changed
+        the page gets it rendered while another request holds the lock,
+        and the others then get the rendered page from the cache."""
+        url = self.urls['post']
+        self.guest_client.get(url)
+        acquire(page_key(RequestFactory().get(url)))
+        writer = Client()
+        writer.force_login(self.other)
+        writer.post(
+            reverse('add_comment', args=[self.author.username, self.post.pk]),
+            {'text': 'Новый комментарий'}
+        )
+        self.assertIn(WRITER_COOKIE, writer.cookies)
+        self.assertContains(writer.get(url), 'Новый комментарий')
+        self.assertTrue(self.is_cached(url))
+        self.assertContains(self.guest_client.get(url), 'Новый комментарий')
+
+    def test_viewers_share_index_fragment(self):
+        """The function checks that the feed of the index page rendered
+        with the holes is cached once for all viewers."""
+        url = self.urls['index']
+        for user in (self.author, self.other):
+            client = Client()
+            client.force_login(user)
+            cache.delete(page_key(RequestFactory().get(url)))
+            client.get(url)
+        fragments = [
+            key for key in cache._cache if ':fragment:index_page:' in key
+        ]
+        self.assertEqual(len(fragments), 1)
+
+    def test_viewers_share_page_with_own_parts(self):
+        """The function checks that the page rendered once is served
+        to every viewer with the parts of that viewer."""
+        author_client = Client()
+        author_client.force_login(self.author)
+        other_client = Client()
+        other_client.force_login(self.other)
+        url = self.urls['post']
+        edit_url = reverse(
+            'post_edit', args=[self.author.username, self.post.pk]
+        )
+        response = author_client.get(url)
+        self.assertContains(response, 'Пользователь: vsemikin')
+        self.assertContains(response, edit_url)
+        with CaptureQueriesContext(connection) as context:
+            response = other_client.get(url)
+        self.assertFalse(any(
+            'posts_post' in query['sql']
+            for query in context.captured_queries
+        ))
+        self.assertContains(response, 'Пользователь: other')
+        self.assertContains(response, 'Подписаться')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertNotContains(response, edit_url)
+        self.assertNotContains(response, '<!--hole:')
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'Войти')
+        self.assertNotContains(response, 'csrfmiddlewaretoken')
+
+    def test_validator_depends_on_viewer(self):
+        """The function checks that the validator of the cached page
+        of one viewer does not match the other."""
+        client = Client()
+        client.force_login(self.other)
+        url = self.urls['index']
+        etag = client.get(url)['ETag']
+        response = client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+
+class CachedValueTests(TestCase):
+    """The class checks the single-flight regeneration of cached values."""
+    def setUp(self):
+        """Setting the data for testing."""
+        cache.clear()
+        self.calls = []
+
+    def compute(self, value):
+        def compute():
+            self.calls.append(value)
+            return value
+        return compute
+
+    def test_fresh_value_is_not_computed(self):
+        """The function checks that a fresh value is taken from the cache
+        and a new version is computed."""
+        self.assertEqual(cached_value('key', self.compute(1), 60, 1), 1)
+        self.assertEqual(cached_value('key', self.compute(2), 60, 1), 1)
+        self.assertEqual(cached_value('key', self.compute(2), 60, 2), 2)
+        self.assertEqual(self.calls, [1, 2])
+
+    def test_outdated_value_is_served_while_computed(self):
+        """The function checks that only the lock holder computes
+        the outdated value and the others get the old one."""
+        cached_value('key', self.compute(1), 60, 1)
+        acquire('key')
+        self.assertEqual(cached_value('key', self.compute(2), 60, 2), 1)
+        self.assertEqual(self.calls, [1])
+
+    def test_expired_value_is_computed_in_background(self):
+        """The function checks that with background the outdated value
+        is returned at once and replaced by a thread."""
+        cached_value('key', self.compute(1), 60)
+        version, fresh_until, value = cache.get('key')
+        cache.set('key', (version, fresh_until - 60, value))
+        self.assertEqual(
+            cached_value('key', self.compute(2), 60, background=True), 1
+        )
+        deadline = time.monotonic() + 5
+        while 2 not in self.calls and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(cached_value('key', self.compute(3), 60), 2)
+
+    def test_missing_value_waits_for_lock_holder(self):
+        """The function checks that without a value to serve the others
+        wait for the lock holder and then compute it themselves."""
+        acquire('key')
+        with mock.patch('posts.caching.LOCK_WAIT', 0.1):
+            self.assertEqual(cached_value('key', self.compute(1), 60), 1)
+        self.assertEqual(self.calls, [1])
+
+
+class SharedMemoryCacheTests(TestCase):
+    """The class checks the cache shared by the worker processes."""
+    def setUp(self):
+        """Setting the data for testing."""
+        self.tmp_dir = tempfile.mkdtemp()
+        self.location = os.path.join(self.tmp_dir, 'cache.sqlite3')
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+
+    def make_cache(self, **options):
+        return SharedMemoryCache(self.location, {'OPTIONS': options})
+
+    def test_entries_are_visible_to_other_connections(self):
+        """The function checks that another instance of the backend
+        reads what the first one wrote."""
+        self.cache.set_many({'a': 1, 'b': [2]})
+        self.assertEqual(
+            self.make_cache().get_many(['a', 'b', 'c']), {'a': 1, 'b': [2]}
+        )
+        self.assertFalse(self.cache.add('a', 3))
+        self.assertTrue(self.cache.delete('a'))
+        self.assertIsNone(self.make_cache().get('a'))
+
+    def test_entries_expire(self):
+        """The function checks the per-key timeout."""
+        self.cache.set('short', 1, timeout=0.05)
+        self.cache.set('long', 1, timeout=60)
+        time.sleep(0.1)
+        self.assertFalse(self.cache.has_key('short'))
+        self.assertTrue(self.cache.add('short', 2))
+        self.assertEqual(self.cache.get('long'), 1)
+
+    def test_least_recently_used_is_evicted(self):
+        """The function checks that the oldest entries are removed
+        when the cache is full."""
+        cache = self.make_cache(MAX_ENTRIES=3, CULL_FREQUENCY=3)
+        for key in ('a', 'b', 'c', 'd'):
+            cache.set(key, key)
+            time.sleep(0.01)
+        self.assertIsNone(cache.get('a'))
+        self.assertEqual(cache.get('d'), 'd')
+
+    def test_incr_is_atomic_across_processes(self):
+        """The function checks that concurrent increments made by
+        several processes are not lost."""
+        self.cache.set('counter', 0)
+        processes = [
+            multiprocessing.Process(target=_increment, args=(self.location,))
+            for _ in range(4)
+        ]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        self.assertEqual(self.cache.get('counter'), 4 * INCREMENTS)
+
+
+INCREMENTS = 50
+
+
+def _increment(location):
+    cache = SharedMemoryCache(location, {})
+    for _ in range(INCREMENTS):
+        cache.incr('counter')
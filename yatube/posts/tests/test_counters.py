@@ -0,0 +1,129 @@
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+
+from ..caching import group_scope
+from ..counters import feed_count
+from ..models import AuthorStats, FeedStats, Follow, Group, Post
+
+User = get_user_model()
+
+
+class AuthorStatsTests(TestCase):
+    """The class checks the denormalized counters of the authors."""
+    @classmethod
+    def setUpClass(cls):
+        """Creating a test object."""
+        super().setUpClass()
+        cls.author = User.objects.create(username='vsemikin')
+        cls.user = User.objects.create(username='oleg')
+
+    def stats(self, user):
+        return AuthorStats.objects.get(author=user)
+
+    def test_posts_counter(self):
+        """The function checks the post counter on create and delete."""
+        post = Post.objects.create(text='Текст', author=self.author)
+        Post.objects.create(text='Текст', author=self.author)
+        self.assertEqual(self.stats(self.author).posts_count, 2)
+        post.delete()
+        self.assertEqual(self.stats(self.author).posts_count, 1)
+
+    def test_follow_counters(self):
+        """The function checks the subscription counters."""
+        Follow.objects.create(user=self.user, author=self.author)
+        self.assertEqual(self.stats(self.author).followers_count, 1)
+        self.assertEqual(self.stats(self.user).following_count, 1)
+        Follow.objects.filter(user=self.user).delete()
+        self.assertEqual(self.stats(self.author).followers_count, 0)
+        self.assertEqual(self.stats(self.user).following_count, 0)
+
+    def test_command_repairs_drift(self):
+        """The function checks that the command restores
+        the damaged counters."""
+        Post.objects.create(text='Текст', author=self.author)
+        Follow.objects.create(user=self.user, author=self.author)
+        AuthorStats.objects.update(
+            posts_count=100, followers_count=100, following_count=100
+        )
+        call_command('recount_author_stats', batch_size=1, stdout=StringIO())
+        stats = self.stats(self.author)
+        self.assertEqual(
+            (stats.posts_count, stats.followers_count, stats.following_count),
+            (1, 1, 0)
+        )
+        self.assertEqual(self.stats(self.user).following_count, 1)
+
+
+class FeedStatsTests(TestCase):
+    """The class checks the denormalized counters of the feeds."""
+    @classmethod
+    def setUpClass(cls):
+        """Creating a test object."""
+        super().setUpClass()
+        cls.author = User.objects.create(username='vsemikin')
+
+    def setUp(self):
+        """Setting the data for testing."""
+        self.group = Group.objects.create(title='Тест', slug='test')
+        self.other = Group.objects.create(title='Другая', slug='other')
+        self.group_feed = group_scope(self.group.pk)
+        self.other_feed = group_scope(self.other.pk)
+        self.post = Post.objects.create(
+            text='Текст', author=self.author, group=self.group
+        )
+
+    def test_counters_follow_the_posts(self):
+        """The function checks the counters on create, move and delete."""
+        self.assertEqual(feed_count(), 1)
+        self.assertEqual(feed_count(self.group_feed), 1)
+        self.assertEqual(feed_count(self.other_feed), 0)
+        Post.objects.create(text='Текст', author=self.author)
+        self.post.group = self.other
+        self.post.save()
+        with self.assertNumQueries(3):
+            self.assertEqual(
+                [feed_count(), feed_count(self.group_feed),
+                 feed_count(self.other_feed)],
+                [2, 0, 1]
+            )
+        self.post.delete()
+        self.assertEqual(feed_count(), 1)
+        self.assertEqual(feed_count(self.other_feed), 0)
+
+    def test_deleted_group_is_forgotten(self):
+        """The function checks that the counter of the deleted group
+        is removed with the group."""
+        feed_count(self.group_feed)
+        self.group.delete()
+        self.assertFalse(
+            FeedStats.objects.filter(scope=self.group_feed).exists()
+        )
+
+    def test_long_feed_is_estimated(self):
+        """The function checks that the feed of all posts not counted
+        yet is estimated by the table statistics when it is too long to
+        count and the estimate is stored. Group feeds are counted."""
+        Post.objects.create(text='Текст', author=self.author)
+        FeedStats.objects.all().delete()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        with mock.patch('posts.counters.EXACT_COUNT_LIMIT', 0):
+            self.assertEqual(feed_count(), 2)
+            self.assertEqual(feed_count(self.group_feed), 1)
+            self.assertEqual(feed_count(self.other_feed), 0)
+        with self.assertNumQueries(1):
+            self.assertEqual(feed_count(), 2)
+
+    def test_command_repairs_feeds(self):
+        """The function checks that the command restores
+        the damaged counters of the feeds."""
+        feed_count()
+        FeedStats.objects.update(posts_count=100)
+        call_command('recount_author_stats', stdout=StringIO())
+        self.assertEqual(feed_count(), 1)
+        self.assertEqual(feed_count(self.group_feed), 1)
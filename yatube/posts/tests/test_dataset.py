@@ -0,0 +1,123 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from .. import dataset, search
+from ..models import AuthorStats, Comment, Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+
+class DatasetTests(TestCase):
+    """The class checks the generator of the test data."""
+    def test_generated_data_is_complete(self):
+        """The function checks that the rows written in bulk get the same
+        derived data as the rows written by the views."""
+        dataset.generate(
+            users=10, groups=2, posts=50, comments=80, follows=20, seed=1
+        )
+        self.assertEqual(User.objects.count(), 10)
+        self.assertEqual(Post.objects.count(), 50)
+        self.assertEqual(Comment.objects.count(), 80)
+        post = Post.objects.first()
+        self.assertEqual(post.updated, post.pub_date)
+        self.assertGreater(
+            post.pub_date, Post.objects.last().pub_date
+        )
+        expected = sum(
+            Post.objects.filter(author_id=author_id).count()
+            for author_id in Follow.objects.values_list(
+                'author_id', flat=True
+            )
+        )
+        self.assertEqual(TimelineEntry.objects.count(), expected)
+        for stats in AuthorStats.objects.select_related('author'):
+            self.assertEqual(stats.posts_count, stats.author.posts.count())
+            self.assertEqual(
+                stats.followers_count, stats.author.following.count()
+            )
+        word = post.text.split()[0]
+        found, _ = search.search_posts(word, limit=100)
+        self.assertIn(post, found)
+
+    def test_insert_keeps_dates_without_touching_fields(self):
+        """The function checks that the given dates are written while
+        the saves of the other code still get the current time."""
+        author = User.objects.create(username='vsemikin')
+        old = timezone.now() - timedelta(days=30)
+        field = Post._meta.get_field('pub_date')
+
+        def posts():
+            for number in range(3):
+                self.assertTrue(field.auto_now_add)
+                yield Post(
+                    text=f'Текст {number}', author=author,
+                    pub_date=old, updated=old
+                )
+
+        dataset.insert(Post, posts(), batch_size=2)
+        self.assertEqual(
+            set(Post.objects.values_list('pub_date', flat=True)), {old}
+        )
+        self.assertGreater(
+            Post.objects.create(text='Новый', author=author).pub_date, old
+        )
+
+    @override_settings(TIMELINE_DEPTH=5)
+    def test_timelines_are_bounded_by_depth(self):
+        """The function checks that the timelines grow with the number
+        of the users and not with follows x posts."""
+        dataset.generate(
+            users=10, groups=2, posts=200, comments=10, follows=40, seed=2
+        )
+        self.assertLessEqual(
+            TimelineEntry.objects.count(), 5 * User.objects.count()
+        )
+        self.assertFalse(
+            TimelineEntry.objects.values('user').annotate(
+                entries=Count('id')
+            ).filter(entries__gt=5).exists()
+        )
+
+    def test_same_seed_gives_same_data(self):
+        """The function checks that the generation is deterministic."""
+        dataset.generate(users=5, groups=1, posts=10, comments=0, seed=7)
+        posts = Post.objects.order_by('id').values_list(
+            'author_id', 'group_id', 'text'
+        )
+        first = list(posts)
+        Post.objects.all().delete()
+        dataset.generate(users=0, groups=1, posts=10, comments=0, seed=7)
+        self.assertEqual(len(first), 10)
+        self.assertEqual(list(posts), first)
+
+    def test_popularity_follows_power_law(self):
+        """The function checks that a few authors, groups and posts
+        get most of the posts, followers and comments."""
+        dataset.generate(
+            users=100, groups=10, posts=2000, comments=2000, follows=2000,
+            seed=3
+        )
+
+        def top_share(queryset, field):
+            counts = sorted(
+                queryset.order_by().values(field).annotate(total=Count('id'))
+                .values_list('total', flat=True), reverse=True
+            )
+            return sum(counts[:len(counts) // 10 or 1]) / sum(counts)
+
+        self.assertGreater(top_share(Post.objects, 'author'), 0.25)
+        self.assertGreater(
+            top_share(Post.objects.exclude(group=None), 'group'), 0.25
+        )
+        self.assertGreater(top_share(Follow.objects, 'author'), 0.25)
+        self.assertGreater(top_share(Comment.objects, 'post'), 0.4)
+
+    def test_sizes_add_up(self):
+        """The function checks the split of the total number of rows."""
+        sizes = dataset.sizes(1000000)
+        self.assertAlmostEqual(sum(sizes.values()), 1000000, delta=10)
+        self.assertGreater(sizes['comments'], sizes['posts'])
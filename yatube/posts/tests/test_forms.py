@@ -1,12 +1,19 @@
 import shutil
 import tempfile
+import threading
+from io import BytesIO
+from unittest import mock
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
+from PIL import Image
 
+from posts import thumbnails
+from posts.images import MAX_SIDE
 from posts.models import Post
 
 User = get_user_model()
@@ -64,6 +71,7 @@ class YatubeNewPostTests(TestCase):
         )
         self.assertEqual(Post.objects.count(), post_count + 1)
         self.assertEqual(response.status_code, 200)
+        self.assertTrue(Post.objects.get(text='Новый пост').image)
 
     def test_form_post_edit(self):
         """The function checks the change of the corresponding record
@@ -77,3 +85,134 @@ class YatubeNewPostTests(TestCase):
             follow=True
         )
         self.assertEqual(response.context['post'].text, form_data['text'])
+
+
+@override_settings(
+    MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR),
+    THUMBNAIL_PREGENERATE_WORKERS=1
+)
+class ThumbnailPregenerationTests(TestCase):
+    """The class checks that thumbnails are created outside
+    the request showing the post."""
+    def setUp(self):
+        """Setting the data for testing."""
+        cache.clear()
+        small_gif = (
+            b'\x47\x49\x46\x38\x39\x61\x01\x00'
+            b'\x01\x00\x00\x00\x00\x21\xf9\x04'
+            b'\x01\x0a\x00\x01\x00\x2c\x00\x00'
+            b'\x00\x00\x01\x00\x01\x00\x00\x02'
+            b'\x02\x4c\x01\x00\x3b'
+        )
+        self.post = Post.objects.create(
+            text='Тестовый пост',
+            author=User.objects.create(username='vsemikin'),
+            image=SimpleUploadedFile('small.gif', small_gif, 'image/gif')
+        )
+        self.geometry, self.options = thumbnails.THUMBNAIL_SIZES[0]
+
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def test_page_shows_original_until_thumbnail_is_ready(self):
+        """The function checks the fallback to the original image
+        and the thumbnail after generation."""
+        thumbnails._pending.add(self.post.id)
+        self.assertIsNone(thumbnails.ready_thumbnail(
+            self.post, self.geometry, **self.options
+        ))
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, self.post.image.url)
+        thumbnails.generate(self.post.id)
+        self.assertNotIn(self.post.id, thumbnails._pending)
+        thumbnail = thumbnails.ready_thumbnail(
+            self.post, self.geometry, **self.options
+        )
+        self.assertIsNotNone(thumbnail)
+        response = self.client.get(reverse('index'))
+        self.assertContains(response, thumbnail.url)
+
+    def test_post_is_queued_once(self):
+        """The function checks that the requests showing the post
+        at the same time queue its thumbnails once."""
+        executor = mock.Mock()
+        barrier = threading.Barrier(8)
+
+        def show():
+            barrier.wait()
+            thumbnails.ready_thumbnail(
+                self.post, self.geometry, **self.options
+            )
+
+        with mock.patch.object(
+            thumbnails, '_get_executor', return_value=executor
+        ):
+            threads = [threading.Thread(target=show) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.addCleanup(thumbnails._pending.discard, self.post.id)
+        executor.submit.assert_called_once_with(
+            thumbnails.generate, self.post.id
+        )
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp(dir=settings.BASE_DIR))
+class ImageUploadPipelineTests(TestCase):
+    """The class checks the processing of uploaded images."""
+    def setUp(self):
+        """Setting the data for testing."""
+        self.user = User.objects.create(username='vsemikin')
+        self.authorized_client = Client()
+        self.authorized_client.force_login(self.user)
+
+    def tearDown(self):
+        shutil.rmtree(settings.MEDIA_ROOT, ignore_errors=True)
+
+    def test_upload_is_rotated_downscaled_and_stripped(self):
+        """The function checks that a huge photo taken sideways is
+        turned upright, reduced and saved without metadata."""
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation: rotate 90 degrees clockwise
+        exif[0x010f] = 'Camera'  # Make
+        source = BytesIO()
+        Image.new('RGB', (3000, 1000), 'red').save(
+            source, 'JPEG', exif=exif.tobytes()
+        )
+        upload = SimpleUploadedFile(
+            'photo.jpg', source.getvalue(), content_type='image/jpeg'
+        )
+        self.authorized_client.post(
+            reverse('new_post'), {'text': 'Фото', 'image': upload}
+        )
+        post = Post.objects.get(text='Фото')
+        self.assertTrue(post.image.name.endswith('.webp'))
+        self.assertEqual(
+            (post.image_width, post.image_height),
+            (round(MAX_SIDE / 3), MAX_SIDE)
+        )
+        with Image.open(post.image.path) as stored:
+            self.assertEqual(stored.format, 'WEBP')
+            self.assertEqual(stored.size, (round(MAX_SIDE / 3), MAX_SIDE))
+            self.assertFalse(stored.getexif())
+
+    def test_admin_upload_is_processed(self):
+        """The function checks that an image added in the admin panel
+        goes through the same pipeline and keeps its size."""
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        self.authorized_client.force_login(admin)
+        source = BytesIO()
+        Image.new('RGB', (3000, 1500), 'blue').save(source, 'PNG')
+        upload = SimpleUploadedFile(
+            'photo.png', source.getvalue(), content_type='image/png'
+        )
+        self.authorized_client.post(
+            reverse('admin:posts_post_add'),
+            {'text': 'Из админки', 'author': self.user.pk, 'image': upload}
+        )
+        post = Post.objects.get(text='Из админки')
+        self.assertTrue(post.image.name.endswith('.webp'))
+        self.assertEqual(
+            (post.image_width, post.image_height), (MAX_SIDE, MAX_SIDE // 2)
+        )
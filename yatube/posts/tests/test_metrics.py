@@ -0,0 +1,129 @@
+import os
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from yatube.metrics import registry
+
+from ..models import Post
+
+User = get_user_model()
+
+
+class MetricsTests(TestCase):
+    """The class checks the collection and the exposition of metrics."""
+    def setUp(self):
+        """Setting the data for testing."""
+        self.guest_client = Client()
+        self.user = User.objects.create(username='vsemikin')
+        self.post = Post.objects.create(text='Текст', author=self.user)
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+    def sample(self, name, view, le=''):
+        return registry.samples().get((name, view, le), 0)
+
+    def test_request_is_measured_by_url_name(self):
+        """The function checks that the time, the queries and the
+        template rendering are recorded under the name of the view."""
+        self.guest_client.get(reverse('profile', args=['vsemikin']))
+        self.guest_client.get(reverse('profile', args=['vsemikin']))
+        self.assertEqual(
+            self.sample('yatube_request_seconds_count', 'profile'), 2
+        )
+        self.assertGreater(
+            self.sample('yatube_request_db_queries_sum', 'profile'), 0
+        )
+        self.assertGreater(
+            self.sample('yatube_request_template_seconds_sum', 'profile'), 0
+        )
+        self.assertEqual(
+            self.sample('yatube_request_seconds_count', 'index'), 0
+        )
+
+    def test_cache_lookups_are_counted(self):
+        """The function checks that the hits and the misses of the
+        configured cache are counted."""
+        self.guest_client.get(reverse('index'))
+        self.guest_client.get(reverse('index'))
+        for name in ('yatube_cache_misses_total', 'yatube_cache_hits_total'):
+            with self.subTest(name=name):
+                self.assertGreater(self.sample(name, 'index'), 0)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_endpoint_exposes_prometheus_text(self):
+        """The function checks the format of the metrics page."""
+        self.guest_client.get(reverse('index'))
+        response = self.guest_client.get(
+            reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        self.assertIn('# TYPE yatube_request_seconds histogram', text)
+        self.assertIn(
+            'yatube_request_seconds_bucket{view="index",le="+Inf"} 1', text
+        )
+        self.assertIn('yatube_request_seconds_count{view="index"} 1', text)
+        self.assertNotIn('view="metrics"', text)
+
+    def test_endpoint_is_internal(self):
+        """The function checks that the metrics are hidden from
+        the addresses outside of INTERNAL_IPS."""
+        response = self.guest_client.get(
+            reverse('metrics'), REMOTE_ADDR='203.0.113.1'
+        )
+        self.assertEqual(response.status_code, 404)
+
+    @override_settings(METRICS_TOKEN='secret')
+    def test_endpoint_requires_token(self):
+        """The function checks that with the token configured the local
+        address of the proxy is not enough to read the metrics."""
+        for headers in ({}, {'HTTP_AUTHORIZATION': 'Bearer wrong'}):
+            with self.subTest(headers=headers):
+                response = self.guest_client.get(
+                    reverse('metrics'), REMOTE_ADDR='127.0.0.1', **headers
+                )
+                self.assertEqual(response.status_code, 404)
+
+
+class SharedMetricsTests(TestCase):
+    """The class checks the metrics shared by the worker processes."""
+    def setUp(self):
+        """Setting the data for testing."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        location = os.path.join(directory, 'metrics.sqlite3')
+        caches = {'default': {
+            'BACKEND': 'yatube.metrics.MeasuredCache',
+            'LOCATION': os.path.join(directory, 'cache.sqlite3'),
+            'OPTIONS': {
+                'CACHE_BACKEND': 'yatube.shm_cache.SharedMemoryCache',
+            },
+        }}
+        override = override_settings(
+            METRICS_LOCATION=location, CACHES=caches
+        )
+        override.enable()
+        self.addCleanup(override.disable)
+        registry.clear()
+        self.addCleanup(registry.clear)
+
+    def test_samples_are_stored_in_the_shared_file(self):
+        """The function checks that the samples and the cache lookups
+        reach the shared file."""
+        Client().get(reverse('index'))
+        Client().get(reverse('index'))
+        registry.flush(force=True)
+        samples = registry._db().execute(
+            'SELECT name, value FROM samples WHERE view = ?', ['index']
+        ).fetchall()
+        samples = dict(
+            (name, value) for name, value in samples
+            if not name.endswith('_bucket')
+        )
+        self.assertEqual(samples['yatube_request_seconds_count'], 2)
+        self.assertGreater(samples['yatube_cache_misses_total'], 0)
+        self.assertGreater(samples['yatube_cache_hits_total'], 0)
@@ -0,0 +1,118 @@
+import re
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from ..models import Comment, Follow, Group, Post
+from ..paginator import COMMENTS_PER_PAGE, PER_PAGE
+from ..search import SEARCH_TABLES, search_posts
+
+User = get_user_model()
+
+FULL_SCAN = re.compile(r'^SCAN (TABLE )?(?P<table>\w+)( AS \w+)?$')
+TEMP_SORT = 'USE TEMP B-TREE'
+# Tables read in full on purpose: the list of the popular authors is
+# short and cached, the SQLite catalog is read for the statistics.
+SCANNED_TABLES = {'posts_popularauthor', 'sqlite_master'}
+
+
+def query_plan(sql):
+    """The function returns the steps of the plan of the query."""
+    with connection.cursor() as cursor:
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+@override_settings(TIMELINE_FANOUT_LIMIT=2)
+class QueryPlanTests(TestCase):
+    """The class checks that every query of the views is served by the
+    indexes: no table is scanned in full and no rows are sorted
+    in a temporary B-tree."""
+    def setUp(self):
+        """Setting the data for testing."""
+        cache.clear()
+        self.author = User.objects.create(username='vsemikin')
+        self.reader = User.objects.create(username='oleg')
+        self.star = User.objects.create(username='star')
+        self.group = Group.objects.create(title='Тест', slug='test')
+        for user in (self.reader, self.author):
+            Follow.objects.create(user=user, author=self.star)
+        Follow.objects.create(user=self.reader, author=self.author)
+        for item in range(PER_PAGE // 2 + 1):
+            for author in (self.author, self.star):
+                post = Post.objects.create(
+                    text=f'Текст поста {item}', author=author,
+                    group=self.group
+                )
+                Comment.objects.create(
+                    post=post, author=self.reader, text='Комментарий'
+                )
+        self.post = post
+        Comment.objects.bulk_create(
+            Comment(post=post, author=self.author, text='Комментарий')
+            for _ in range(COMMENTS_PER_PAGE)
+        )
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def requests(self):
+        post_args = [self.post.author.username, self.post.pk]
+        index = self.client.get(reverse('index')).context
+        post_view = self.client.get(
+            reverse('post_view', args=post_args)
+        ).context
+        yield 'get', reverse('index'), {'after': index['page'].next_cursor}
+        yield 'get', reverse('index'), {'page': 2}
+        yield 'get', reverse('group_posts', args=[self.group.slug]), None
+        yield 'get', reverse('profile', args=[self.author.username]), None
+        yield 'get', reverse('post_view', args=post_args), None
+        yield 'get', reverse('post_comments', args=post_args), {
+            'after': post_view['next_cursor']
+        }
+        yield 'get', reverse('follow_index'), None
+        yield 'get', reverse('search'), {'q': 'текст'}
+        yield 'post', reverse('add_comment', args=post_args), {
+            'text': 'Новый комментарий'
+        }
+        yield 'post', reverse('new_post'), {'text': 'Новый пост'}
+
+    def test_queries_use_indexes(self):
+        """The function runs EXPLAIN QUERY PLAN for the queries
+        of every view."""
+        for method, url, data in self.requests():
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                getattr(self.client, method)(url, data)
+            for query in context.captured_queries:
+                sql = query['sql']
+                if not sql.startswith('SELECT'):
+                    continue
+                for step in query_plan(sql):
+                    scan = FULL_SCAN.match(step)
+                    with self.subTest(url=url, sql=sql, step=step):
+                        self.assertTrue(
+                            scan is None
+                            or scan.group('table') in SCANNED_TABLES
+                        )
+                        self.assertNotIn(TEMP_SORT, step)
+
+    def test_search_is_ordered_by_index(self):
+        """The function checks that the search results are ordered
+        by the rank inside the full-text index."""
+        with CaptureQueriesContext(connection) as context:
+            search_posts('текст', limit=PER_PAGE)
+            search_posts('текст', (0.0, self.post.pk), limit=PER_PAGE)
+        ranked = [
+            query['sql'] for query in context.captured_queries
+            if 'MATCH' in query['sql']
+        ]
+        self.assertEqual(len(ranked), 2)
+        for sql in ranked:
+            with self.subTest(sql=sql):
+                self.assertEqual(query_plan(sql), [
+                    f'SCAN {SEARCH_TABLES[Post]} VIRTUAL TABLE INDEX 32:M1'
+                ])
@@ -0,0 +1,95 @@
+from django.contrib.admin.sites import site
+from django.contrib.auth import get_user_model
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Post
+from ..search import (decode_cursor, filter_queryset, match_expression,
+                      search_posts)
+
+User = get_user_model()
+
+
+class SearchTests(TestCase):
+    """The class checks the full-text search of posts."""
+    @classmethod
+    def setUpClass(cls):
+        """Creating a test objects."""
+        super().setUpClass()
+        cls.user = User.objects.create(username='vsemikin')
+        cls.cat = Post.objects.create(text='Кот спит', author=cls.user)
+        cls.cats = Post.objects.create(
+            text='Кот и ещё кот, котики повсюду', author=cls.user
+        )
+        cls.dog = Post.objects.create(text='Собака лает', author=cls.user)
+
+    def setUp(self):
+        """Setting the data for testing."""
+        self.guest_client = Client()
+
+    def found(self, query, **params):
+        response = self.guest_client.get(
+            reverse('search'), {'q': query, **params}
+        )
+        return response
+
+    def test_match_expression_is_safe(self):
+        """The function checks that the query syntax of the user
+        does not reach FTS5."""
+        self.assertEqual(match_expression('кот" OR *'), '"кот"* "or"*')
+        self.assertEqual(match_expression('***'), '')
+
+    def test_search_ranks_and_pages_results(self):
+        """The function checks the order of results and the cursor
+        of the next page."""
+        response = self.found('кот')
+        self.assertEqual(
+            [post.id for post in response.context['posts']],
+            [self.cats.id, self.cat.id]
+        )
+        posts, cursor = search_posts('кот', limit=1)
+        self.assertEqual(posts, [self.cats])
+        posts, cursor = search_posts('кот', decode_cursor(cursor), limit=1)
+        self.assertEqual(posts, [self.cat])
+        self.assertIsNone(cursor)
+
+    def test_equal_ranks_are_paged_by_id(self):
+        """The function checks that the cursor pages through
+        the matches of the same rank without gaps."""
+        twins = [
+            Post.objects.create(text='Одинаковый текст', author=self.user)
+            for _ in range(5)
+        ]
+        found, cursor = [], None
+        while True:
+            posts, token = search_posts('одинаковый', cursor, limit=2)
+            found += posts
+            if token is None:
+                break
+            cursor = decode_cursor(token)
+        self.assertEqual(found, twins)
+
+    def test_index_follows_changes(self):
+        """The function checks that edited and deleted posts are found
+        by their new text only."""
+        self.dog.text = 'Собака спит'
+        self.dog.save()
+        self.assertIn(self.dog, self.found('спит').context['posts'])
+        self.dog.delete()
+        self.assertNotIn(self.dog, self.found('спит').context['posts'])
+
+    def test_admin_uses_index(self):
+        """The function checks the admin search of posts and comments."""
+        comment = Comment.objects.create(
+            post=self.dog, author=self.user, text='Громко лает'
+        )
+        request = RequestFactory().get('/')
+        for model, expected in ((Post, self.dog), (Comment, comment)):
+            with self.subTest(model=model):
+                queryset, _ = site._registry[model].get_search_results(
+                    request, model.objects.all(), 'лает'
+                )
+                self.assertEqual(list(queryset), [expected])
+        self.assertEqual(
+            list(filter_queryset(Post.objects.all(), 'котик')), [self.cats]
+        )
@@ -0,0 +1,26 @@
+from django.db import connection
+from django.test import TestCase, override_settings
+from yatube.sqlite import configure_connection
+
+
+class SqlitePragmaTests(TestCase):
+    """The class checks the tuning of new SQLite connections."""
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    @override_settings(SQLITE_PRAGMAS={'cache_size': -4321})
+    def test_pragmas_are_applied(self):
+        """The function checks that the pragmas from the settings
+        are set on the connection."""
+        configure_connection(sender=None, connection=connection)
+        self.assertEqual(self.pragma('cache_size'), -4321)
+
+    @override_settings(SQLITE_PRAGMAS={})
+    def test_no_pragmas_by_default(self):
+        """The function checks that the connection is left untouched
+        without pragmas in the settings."""
+        cache_size = self.pragma('cache_size')
+        configure_connection(sender=None, connection=connection)
+        self.assertEqual(self.pragma('cache_size'), cache_size)
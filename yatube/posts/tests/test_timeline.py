@@ -0,0 +1,212 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..feeds import author_posts
+from ..models import Follow, PopularAuthor, Post, TimelineEntry
+from ..paginator import PER_PAGE, keyset_slice
+from ..timeline import POPULAR_AUTHORS_KEY, rebuild
+
+User = get_user_model()
+
+
+class TimelineTests(TestCase):
+    """The class checks the materialized favourites feed."""
+    def setUp(self):
+        """Setting the data for testing."""
+        cache.delete(POPULAR_AUTHORS_KEY)
+        self.author = User.objects.create(username='vsemikin')
+        self.user = User.objects.create(username='oleg')
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def feed_ids(self):
+        response = self.client.get(reverse('follow_index'))
+        return [post.id for post in response.context['page']]
+
+    def test_new_post_is_fanned_out(self):
+        """The function checks that a new post gets into
+        the subscriber's timeline."""
+        Follow.objects.create(user=self.user, author=self.author)
+        post = Post.objects.create(text='Текст', author=self.author)
+        self.assertTrue(
+            TimelineEntry.objects.filter(user=self.user, post=post).exists()
+        )
+        self.assertEqual(self.feed_ids(), [post.id])
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        """The function checks that subscribing copies the old posts
+        and unsubscribing removes them."""
+        posts = [
+            Post.objects.create(text=f'Текст {i}', author=self.author)
+            for i in range(3)
+        ]
+        self.client.get(reverse('profile_follow', args=['vsemikin']))
+        self.assertEqual(self.feed_ids(), [post.id for post in posts[::-1]])
+        self.client.get(reverse('profile_unfollow', args=['vsemikin']))
+        self.assertFalse(TimelineEntry.objects.filter(user=self.user))
+        self.assertEqual(self.feed_ids(), [])
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_popular_author_is_merged_at_read_time(self):
+        """The function checks that posts of popular authors are not
+        fanned out but still appear in the feed."""
+        other = User.objects.create(username='galina')
+        Follow.objects.create(user=self.author, author=other)
+        Follow.objects.create(user=self.user, author=self.author)
+        Follow.objects.create(user=self.user, author=other)
+        self.assertTrue(PopularAuthor.objects.filter(author=other).exists())
+        popular_post = Post.objects.create(text='Популярный', author=other)
+        regular_post = Post.objects.create(text='Обычный', author=self.author)
+        self.assertFalse(
+            TimelineEntry.objects.filter(post=popular_post).exists()
+        )
+        self.assertEqual(self.feed_ids(), [regular_post.id, popular_post.id])
+
+    def all_feed_ids(self):
+        """The function walks the favourites feed page by page."""
+        ids, params = [], {}
+        while True:
+            response = self.client.get(reverse('follow_index'), params)
+            page = response.context['page']
+            ids += [post.id for post in page]
+            if page.next_cursor is None:
+                return ids
+            params = {'after': page.next_cursor}
+
+    @override_settings(TIMELINE_DEPTH=3)
+    def test_rebuild_keeps_depth_and_deep_pages_are_complete(self):
+        """The function checks that the rebuilt timeline keeps only the
+        newest posts and the deeper pages are read from the posts."""
+        Follow.objects.create(user=self.user, author=self.author)
+        posts = [
+            Post.objects.create(text=f'Текст {i}', author=self.author)
+            for i in range(PER_PAGE + 2)
+        ]
+        rebuild()
+        self.assertEqual(
+            list(
+                TimelineEntry.objects.filter(user=self.user)
+                .order_by('-pub_date').values_list('post_id', flat=True)
+            ),
+            [post.id for post in posts[:-4:-1]]
+        )
+        self.assertEqual(
+            self.all_feed_ids(), [post.id for post in posts[::-1]]
+        )
+
+    @override_settings(TIMELINE_DEPTH=2)
+    @mock.patch('posts.timeline.TRIM_EVERY', 1)
+    def test_fan_out_and_backfill_trim_to_depth(self):
+        """The function checks that new posts and subscriptions
+        do not grow the timeline over its depth."""
+        other = User.objects.create(username='galina')
+        Follow.objects.create(user=self.user, author=self.author)
+        for i in range(3):
+            Post.objects.create(text=f'Текст {i}', author=self.author)
+            Post.objects.create(text=f'Текст {i}', author=other)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user).count(), 2
+        )
+        Follow.objects.create(user=self.user, author=other)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user).count(), 2
+        )
+        self.assertEqual(len(self.all_feed_ids()), 6)
+
+    @override_settings(TIMELINE_DEPTH=2)
+    def test_unfollow_refills_full_timeline(self):
+        """The function checks that unsubscribing fills a full timeline
+        with the older posts of the other authors."""
+        other = User.objects.create(username='galina')
+        old_posts = [
+            Post.objects.create(text=f'Текст {i}', author=other)
+            for i in range(2)
+        ]
+        for i in range(2):
+            Post.objects.create(text=f'Текст {i}', author=self.author)
+        Follow.objects.create(user=self.user, author=other)
+        follow = Follow.objects.create(user=self.user, author=self.author)
+        follow.delete()
+        self.assertEqual(
+            set(
+                TimelineEntry.objects.filter(user=self.user)
+                .values_list('post_id', flat=True)
+            ),
+            {post.id for post in old_posts}
+        )
+
+
+class AuthorPostsTests(TestCase):
+    """The class checks the feed merged from the cached newest posts
+    of the authors."""
+    def setUp(self):
+        """Setting the data for testing."""
+        cache.clear()
+        self.authors = [
+            User.objects.create(username=f'author{number}')
+            for number in range(3)
+        ]
+        for number in range(4):
+            for author in self.authors:
+                Post.objects.create(text=f'Текст {number}', author=author)
+        self.author_ids = [author.id for author in self.authors]
+
+    def expected(self, cursor=None, newer=False):
+        posts = Post.objects.filter(author_id__in=self.author_ids)
+        return list(
+            keyset_slice(posts, cursor, newer).values_list('pub_date', 'id')
+        )
+
+    def test_pages_follow_the_feed_order(self):
+        """The function checks that the merged pages match the order
+        of the database on both sides of the cursor."""
+        expected = self.expected()
+        self.assertEqual(author_posts(self.author_ids, 5), expected[:5])
+        self.assertEqual(
+            author_posts(self.author_ids, 5, offset=5), expected[5:10]
+        )
+        cursor = expected[4]
+        self.assertEqual(
+            author_posts(self.author_ids, 5, cursor=cursor), expected[5:10]
+        )
+        self.assertEqual(
+            author_posts(self.author_ids, 3, cursor=cursor, newer=True),
+            self.expected(cursor, newer=True)[:3]
+        )
+
+    def test_warm_lists_need_no_queries(self):
+        """The function checks that a page of the cached lists is merged
+        without queries and a new post drops the author's list."""
+        author_posts(self.author_ids, 5)
+        with self.assertNumQueries(0):
+            author_posts(self.author_ids, 5)
+        post = Post.objects.create(text='Новый', author=self.authors[0])
+        self.assertEqual(
+            author_posts(self.author_ids, 1), [(post.pub_date, post.id)]
+        )
+
+    @mock.patch('posts.feeds.AUTHORS_PER_QUERY', 2)
+    def test_cold_lists_are_read_in_batches(self):
+        """The function checks that the missing lists of all authors
+        are read with one query per batch of authors."""
+        with self.assertNumQueries(2):
+            keys = author_posts(self.author_ids, 5)
+        self.assertEqual(keys, self.expected()[:5])
+
+    @mock.patch('posts.feeds.RECENT_LIMIT', 2)
+    def test_deep_pages_are_read_from_database(self):
+        """The function checks that pages below the cached lists are
+        read from the database."""
+        expected = self.expected()
+        self.assertEqual(author_posts(self.author_ids, 5), expected[:5])
+        self.assertEqual(
+            author_posts(self.author_ids, 5, offset=5), expected[5:10]
+        )
+        self.assertEqual(
+            author_posts(self.author_ids, 2, cursor=expected[-1], newer=True),
+            self.expected(expected[-1], newer=True)[:2]
+        )
@@ -0,0 +1,138 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from .. import transfer
+from ..models import AuthorStats, Comment, Follow, Group, Post
+
+User = get_user_model()
+
+
+class TransferTests(TestCase):
+    """The class checks the export and the import of the posts data."""
+    def setUp(self):
+        """Setting the data for testing."""
+        self.author = User.objects.create(username='vsemikin')
+        self.reader = User.objects.create(username='reader')
+        self.group = Group.objects.create(
+            title='Тест', slug='test', description='Описание'
+        )
+        self.post = Post.objects.create(
+            text='Текст', author=self.author, group=self.group,
+            image='posts/photo.webp', image_width=640, image_height=480
+        )
+        Post.objects.filter(pk=self.post.pk).update(
+            pub_date=timezone.now() - timedelta(days=30)
+        )
+        Comment.objects.create(
+            post=self.post, author=self.reader, text='Комментарий'
+        )
+        Follow.objects.create(user=self.reader, author=self.author)
+
+    def snapshot(self):
+        return (
+            list(Group.objects.values()),
+            list(Post.objects.values('id', 'text', 'pub_date', 'updated',
+                                     'author__username', 'group_id',
+                                     'image', 'image_width',
+                                     'image_height')),
+            list(Comment.objects.values('id', 'text', 'created', 'post_id',
+                                        'author__username')),
+            list(Follow.objects.values('user__username',
+                                       'author__username')),
+        )
+
+    def test_export_and_import_restore_the_data(self):
+        """The function checks that the exported rows are loaded back
+        with their ids, dates and image references."""
+        before = self.snapshot()
+        output = io.StringIO()
+        self.assertEqual(transfer.export(output, chunk_size=1), 4)
+        for model in (Follow, Comment, Post, Group, User):
+            model.objects.all().delete()
+        lines = output.getvalue().splitlines(keepends=True)
+        self.assertEqual(transfer.load(lines, batch_size=1), 4)
+        self.assertEqual(self.snapshot(), before)
+        self.assertEqual(
+            transfer.load(lines), 4, 'Повторная загрузка не должна падать'
+        )
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_export_continues_after_the_row(self):
+        """The function checks that the export resumes after the given
+        row without repeating it."""
+        output = io.StringIO()
+        transfer.export(output, after=('post', self.post.pk))
+        models = [json.loads(line)['model']
+                  for line in output.getvalue().splitlines()]
+        self.assertEqual(models, ['comment', 'follow'])
+
+    def test_import_skips_the_offset(self):
+        """The function checks that the import skips the loaded lines."""
+        output = io.StringIO()
+        transfer.export(output)
+        Follow.objects.all().delete()
+        Comment.objects.all().delete()
+        lines = output.getvalue().splitlines(keepends=True)
+        transfer.load(lines, offset=3)
+        self.assertFalse(Comment.objects.exists())
+        self.assertTrue(Follow.objects.exists())
+
+    def test_import_reports_conflicting_rows(self):
+        """The function checks that rows conflicting with other rows
+        of the database are not skipped silently."""
+        output = io.StringIO()
+        transfer.export(output)
+        Post.objects.all().delete()
+        Group.objects.filter(pk=self.group.pk).update(id=self.group.pk + 1)
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'posts.jsonl')
+        with open(path, 'w') as file:
+            file.write(output.getvalue())
+        with self.assertRaisesMessage(CommandError, '--offset 0'):
+            call_command('import_posts', path, stdout=io.StringIO())
+        self.assertFalse(Post.objects.exists())
+
+    def test_commands_rebuild_derived_data(self):
+        """The function checks the commands with a compressed file,
+        resuming of the export and the counters after the import."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'posts.jsonl')
+        with open(path, 'w') as output:
+            transfer.export(output)
+        with open(path, 'rb+') as output:
+            output.truncate(os.path.getsize(path) - 5)
+        call_command('export_posts', path, resume=True, stdout=io.StringIO())
+        with open(path) as rows:
+            self.assertEqual(len([json.loads(row) for row in rows]), 4)
+        gz_path = path + '.gz'
+        call_command('export_posts', gz_path, stdout=io.StringIO())
+        for model in (Follow, Comment, Post, Group, AuthorStats):
+            model.objects.all().delete()
+        call_command('import_posts', gz_path, stdout=io.StringIO())
+        self.assertEqual(Post.objects.count(), 1)
+        self.assertEqual(self.author.stats.followers_count, 1)
+
+    def test_compressed_export_resumes_after_the_cut(self):
+        """The function checks that an interrupted compressed export
+        is resumed and the file is read to its end."""
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'posts.jsonl.gz')
+        call_command('export_posts', path, stdout=io.StringIO())
+        with open(path, 'rb+') as output:
+            output.truncate(os.path.getsize(path) // 2)
+        call_command('export_posts', path, resume=True, stdout=io.StringIO())
+        with transfer.open_file(path, 'r') as rows:
+            models = [json.loads(row)['model'] for row in rows]
+        self.assertEqual(models, ['group', 'post', 'comment', 'follow'])
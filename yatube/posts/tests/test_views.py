@@ -5,11 +5,16 @@ from http import HTTPStatus
 from django import forms
 from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase, override_settings
+from django.db import connection
+from django.test import Client, RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from posts.models import Group, Post
+from posts.models import Comment, Follow, Group, Post
+from posts.paginator import (COMMENTS_PER_PAGE, ELLIPSIS, OFFSET_PAGE_LIMIT,
+                             PER_PAGE, KeysetPaginator, elided_page_range)
 
 User = get_user_model()
 
@@ -217,6 +222,90 @@ class PaginatorViewsTest(TestCase):
         response = self.client.get(reverse('index') + '?page=2')
         self.assertEqual(len(response.context.get('page').object_list), 3)
 
+    def test_cursor_pages_follow_each_other(self):
+        """The function checks that the ?after= and ?before= cursors
+        lead to the neighbouring pages of the feed."""
+        first = self.client.get(reverse('index')).context['page']
+        second = self.client.get(
+            reverse('index') + f'?after={first.next_cursor}'
+        ).context['page']
+        self.assertEqual(second.number, 2)
+        self.assertEqual(len(second.object_list), 3)
+        self.assertFalse(second.has_next())
+        self.assertTrue(
+            first.object_list[-1].pub_date >= second.object_list[0].pub_date
+        )
+        back = self.client.get(
+            reverse('index') + f'?before={second.previous_cursor}'
+        ).context['page']
+        self.assertEqual(back.number, 1)
+        self.assertEqual(
+            [post.id for post in back], [post.id for post in first]
+        )
+
+    def test_broken_cursor_returns_first_page(self):
+        """The function checks that a damaged cursor leads
+        to the first page."""
+        response = self.client.get(reverse('index') + '?after=broken')
+        self.assertEqual(response.context['page'].number, 1)
+        self.assertEqual(len(response.context['page'].object_list), 10)
+
+    def test_page_numbers_are_linked(self):
+        """The function checks that the feed links to the pages
+        by their numbers."""
+        response = self.client.get(reverse('index') + '?page=2')
+        self.assertContains(response, 'href="?page=1"')
+        self.assertNotContains(response, 'href="?page=2"')
+        self.assertEqual(response.context['page'].paginator.count, 13)
+
+    def test_page_past_the_end_is_the_last_page(self):
+        """The function checks that a number past the end of the feed
+        or past the pages served by ?page= leads to the last page."""
+        for number in (3, OFFSET_PAGE_LIMIT + 1):
+            with self.subTest(number=number):
+                response = self.client.get(
+                    reverse('index'), {'page': number}
+                )
+                page = response.context['page']
+                self.assertEqual(page.number, 2)
+                self.assertEqual(len(page.object_list), 3)
+
+    def test_overestimated_feed_leads_to_last_page(self):
+        """The function checks that the last page is found when the
+        counter promises more posts than there are."""
+        paginator = KeysetPaginator(
+            Post.objects.all(), counter=lambda: PER_PAGE * 5
+        )
+        request = RequestFactory().get('/', {'page': 5})
+        page = paginator.get_page_from_request(request)
+        self.assertEqual(page.number, 2)
+        self.assertEqual(len(page.object_list), 3)
+
+    def test_elided_page_range(self):
+        """The function checks the window of page numbers."""
+        self.assertEqual(elided_page_range(2, 4), [1, 2, 3, 4])
+        self.assertEqual(
+            elided_page_range(1, 20), [1, 2, 3, ELLIPSIS, 20]
+        )
+        self.assertEqual(
+            elided_page_range(10, 20),
+            [1, ELLIPSIS, 8, 9, 10, 11, 12, ELLIPSIS, 20]
+        )
+        self.assertEqual(
+            elided_page_range(19, 20), [1, ELLIPSIS, 17, 18, 19, 20]
+        )
+
+    def test_deep_pages_are_not_numbered(self):
+        """The function checks that the numbers are given only to the
+        pages served by ?page= and no more than OFFSET_PAGE_LIMIT."""
+        page = self.client.get(reverse('index')).context['page']
+        paginator = page.paginator
+        paginator.counter = lambda: PER_PAGE * OFFSET_PAGE_LIMIT * 2
+        numbers = paginator.page_numbers(page)
+        self.assertEqual(numbers[-2:], [OFFSET_PAGE_LIMIT, ELLIPSIS])
+        page.number = OFFSET_PAGE_LIMIT + 1
+        self.assertEqual(paginator.page_numbers(page), [])
+
 
 class FollowAndCommentViewsTest(TestCase):
     """The class checks the operation of the subscriptions and
@@ -304,3 +393,173 @@ class FollowAndCommentViewsTest(TestCase):
             )
         )
         self.assertEqual(response.status_code, HTTPStatus.FOUND)
+
+
+class FeedQueryBudgetTest(TestCase):
+    """The class checks that the number of queries of a feed page
+    does not depend on the number of posts on it."""
+    QUERY_BUDGET = 8
+
+    @classmethod
+    def setUpClass(cls):
+        """Creating a test objects."""
+        super().setUpClass()
+        cls.group = Group.objects.create(title='Тест', slug='test')
+        cls.author = User.objects.create(username='vsemikin')
+        cls.reader = User.objects.create(username='oleg')
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        cls.urls = (
+            reverse('index'),
+            reverse('group_posts', args=[cls.group.slug]),
+            reverse('profile', args=[cls.author.username]),
+            reverse('follow_index'),
+        )
+
+    def setUp(self):
+        """Setting the data for testing."""
+        self.authorized_client = Client()
+        self.authorized_client.force_login(FeedQueryBudgetTest.reader)
+
+    def create_posts(self, count):
+        for item in range(count):
+            post = Post.objects.create(
+                text=f'Тестовый текст{item}',
+                author=FeedQueryBudgetTest.author,
+                group=FeedQueryBudgetTest.group
+            )
+            Comment.objects.create(
+                post=post,
+                author=User.objects.create(username=f'user{post.id}'),
+                text='Комментарий'
+            )
+
+    def count_queries(self, url):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.authorized_client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return len(context.captured_queries)
+
+    def test_feed_queries_do_not_depend_on_page_size(self):
+        """The function compares the number of queries of a page
+        with one post and a full page."""
+        self.create_posts(1)
+        single = {url: self.count_queries(url) for url in self.urls}
+        self.create_posts(PER_PAGE - 1)
+        for url in self.urls:
+            with self.subTest(url=url):
+                queries = self.count_queries(url)
+                self.assertEqual(queries, single[url])
+                self.assertLessEqual(
+                    queries, FeedQueryBudgetTest.QUERY_BUDGET
+                )
+
+
+class CommentPaginationTest(TestCase):
+    """The class checks the pages of comments on the post page."""
+    def setUp(self):
+        """Setting the data for testing."""
+        self.guest_client = Client()
+        self.author = User.objects.create(username='vsemikin')
+        self.post = Post.objects.create(text='Текст', author=self.author)
+        self.url = reverse('post_view', args=['vsemikin', self.post.pk])
+
+    def create_comments(self, count):
+        start = Comment.objects.count()
+        for item in range(start, start + count):
+            Comment.objects.create(
+                post=self.post,
+                author=User.objects.create(username=f'reader{item}'),
+                text=f'Комментарий {item}'
+            )
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as context:
+            response = self.guest_client.get(url)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        return len(context.captured_queries)
+
+    def test_comments_are_loaded_by_pages(self):
+        """The function checks that the post page shows the newest
+        comments only and the fragments return the rest in order."""
+        self.create_comments(COMMENTS_PER_PAGE + 5)
+        response = self.guest_client.get(self.url)
+        comments = list(response.context['comments'])
+        self.assertEqual(len(comments), COMMENTS_PER_PAGE)
+        self.assertEqual(
+            comments[0].text, f'Комментарий {COMMENTS_PER_PAGE + 4}'
+        )
+        self.assertContains(response, 'Показать ещё комментарии')
+        response = self.guest_client.get(
+            reverse('post_comments', args=['vsemikin', self.post.pk]),
+            {'after': response.context['next_cursor']}
+        )
+        texts = [comment.text for comment in response.context['comments']]
+        self.assertEqual(
+            texts, [f'Комментарий {item}' for item in range(4, -1, -1)]
+        )
+        self.assertIsNone(response.context['next_cursor'])
+        self.assertNotContains(response, '<html')
+
+    def test_short_discussion_has_no_more_button(self):
+        """The function checks that there is no button when all
+        comments fit into the first page."""
+        self.create_comments(COMMENTS_PER_PAGE)
+        response = self.guest_client.get(self.url)
+        self.assertIsNone(response.context['next_cursor'])
+        self.assertNotContains(response, 'Показать ещё комментарии')
+
+    def test_last_full_page_has_no_more_button(self):
+        """The function checks that the fragment holding the last
+        comments has no button when they fill the page exactly."""
+        self.create_comments(COMMENTS_PER_PAGE * 2)
+        url = reverse('post_comments', args=['vsemikin', self.post.pk])
+        cursor = self.guest_client.get(self.url).context['next_cursor']
+        response = self.guest_client.get(url, {'after': cursor})
+        self.assertEqual(
+            len(response.context['comments']), COMMENTS_PER_PAGE
+        )
+        self.assertIsNone(response.context['next_cursor'])
+        self.assertNotContains(response, 'Показать ещё комментарии')
+
+    def test_post_page_queries_do_not_depend_on_comments(self):
+        """The function checks that the post page is rendered with the
+        same queries for a short and a long discussion."""
+        self.create_comments(2)
+        short = self.count_queries(self.url)
+        self.create_comments(COMMENTS_PER_PAGE * 2)
+        self.assertEqual(self.count_queries(self.url), short)
+
+
+class FollowStateTest(TestCase):
+    """The class checks the follow button of the author's card."""
+    def setUp(self):
+        """Setting the data for testing."""
+        cache.clear()
+        self.author = User.objects.create(username='vsemikin')
+        self.fan = User.objects.create(username='fan')
+        self.reader = User.objects.create(username='oleg')
+        Follow.objects.create(user=self.fan, author=self.author)
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.url = reverse('profile', args=[self.author.username])
+
+    def test_button_shows_viewer_subscription(self):
+        """The function checks that the button tells whether the viewer
+        follows the author and changes at once after subscribing."""
+        self.assertContains(self.client.get(self.url), 'Подписаться')
+        self.client.get(reverse('profile_follow', args=['vsemikin']))
+        self.assertContains(self.client.get(self.url), 'Отписаться')
+        self.client.get(reverse('profile_unfollow', args=['vsemikin']))
+        self.assertContains(self.client.get(self.url), 'Подписаться')
+
+    def test_subscriptions_are_read_once(self):
+        """The function checks that the subscriptions of the viewer
+        are taken from the cache."""
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(self.url)
+        self.assertFalse(any(
+            'posts_follow' in query['sql']
+            for query in context.captured_queries
+        ))
@@ -0,0 +1,113 @@
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from sorl.thumbnail import default, get_thumbnail
+from sorl.thumbnail.images import ImageFile
+
+from .caching import bump_generation, bump_scopes, post_scopes
+from .models import Post
+
+logger = logging.getLogger(__name__)
+
+# Geometry and options of every thumbnail the templates show.
+THUMBNAIL_SIZES = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+# Generated thumbnails are remembered this long. A forgotten one is
+# queued again and sorl finds it in its key-value store.
+READY_TIMEOUT = 60 * 60 * 24 * 30
+
+_executor = None
+_executor_lock = threading.Lock()
+_pending = set()
+_pending_lock = threading.Lock()
+
+
+def _ready_key(image, geometry, options):
+    raw = f'{image.name}|{geometry}|{sorted(options.items())}'
+    return 'thumbnail:' + hashlib.md5(raw.encode()).hexdigest()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.THUMBNAIL_PREGENERATE_WORKERS,
+                thread_name_prefix='thumbnails'
+            )
+        return _executor
+
+
+def generate(post_id):
+    """The function creates all thumbnails of the post's image and
+    outdates the cached pages showing the original instead."""
+    close_old_connections()
+    try:
+        post = Post.objects.filter(pk=post_id).first()
+        if post is None or not post.image:
+            return
+        for geometry, options in THUMBNAIL_SIZES:
+            thumbnail = get_thumbnail(post.image, geometry, **options)
+            cache.set(
+                _ready_key(post.image, geometry, options), thumbnail.name,
+                READY_TIMEOUT
+            )
+        Post.objects.filter(pk=post_id).update(updated=timezone.now())
+        bump_generation()
+        bump_scopes(*post_scopes(post))
+    except Exception:
+        logger.exception('Thumbnails of post %s were not created', post_id)
+    finally:
+        with _pending_lock:
+            _pending.discard(post_id)
+        close_old_connections()
+
+
+def _submit(post_id):
+    with _pending_lock:
+        if post_id in _pending:
+            return
+        _pending.add(post_id)
+    try:
+        _get_executor().submit(generate, post_id)
+    except Exception:
+        with _pending_lock:
+            _pending.discard(post_id)
+        raise
+
+
+def schedule(post):
+    """The function queues the thumbnails of the post's image for
+    generation in the background after the transaction is committed."""
+    if post.image and settings.THUMBNAIL_PREGENERATE_WORKERS:
+        transaction.on_commit(lambda: _submit(post.pk))
+
+
+def ready_thumbnail(post, geometry, **options):
+    """The function returns the thumbnail of the post's image without
+    making the request wait for it. The thumbnails made by generate()
+    are remembered in the cache, so the image and sorl are not touched.
+    If the thumbnail is not ready yet, it is queued and None is returned,
+    so the template shows a fallback. Without background workers
+    the thumbnail is created in place."""
+    if not post.image:
+        return None
+    if not settings.THUMBNAIL_PREGENERATE_WORKERS:
+        try:
+            return get_thumbnail(post.image, geometry, **options)
+        except Exception:
+            logger.exception('Thumbnail of post %s is unavailable', post.pk)
+            return None
+    name = cache.get(_ready_key(post.image, geometry, options))
+    if name is None:
+        _submit(post.pk)
+        return None
+    return ImageFile(name, default.storage)
@@ -0,0 +1,238 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+
+from . import feeds
+from .caching import cached_value
+from .follows import followed_author_ids, following
+from .models import Follow, PopularAuthor, Post, TimelineEntry
+from .paginator import PER_PAGE, KeysetPaginator, keyset_slice
+
+POPULAR_AUTHORS_KEY = 'timeline:popular_authors'
+POPULAR_AUTHORS_TIMEOUT = 60
+BATCH_SIZE = 1000
+# The timelines are trimmed to TIMELINE_DEPTH entries on about every
+# TRIM_EVERY-th post fanned out, so they grow a little over the depth
+# between the trims.
+TRIM_EVERY = 50
+
+
+def popular_author_ids():
+    """The function returns the ids of the authors whose posts
+    are not fanned out to the subscribers."""
+    return cached_value(
+        POPULAR_AUTHORS_KEY,
+        lambda: set(
+            PopularAuthor.objects.values_list('author_id', flat=True)
+        ),
+        POPULAR_AUTHORS_TIMEOUT, background=True
+    )
+
+
+def _write_entries(entries):
+    TimelineEntry.objects.bulk_create(
+        entries, batch_size=BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def fan_out(post):
+    """The function delivers a new post to the timelines
+    of the author's subscribers. Now and then the timelines are trimmed
+    to their depth."""
+    if post.author_id in popular_author_ids():
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    batch = []
+    for user_id in followers.iterator(chunk_size=BATCH_SIZE):
+        batch.append(TimelineEntry(
+            user_id=user_id, author_id=post.author_id,
+            post_id=post.id, pub_date=post.pub_date
+        ))
+        if len(batch) == BATCH_SIZE:
+            _write_entries(batch)
+            batch = []
+    _write_entries(batch)
+    if post.id % TRIM_EVERY == 0:
+        trim_depth(followers)
+
+
+def backfill(follow):
+    """The function copies the author's posts into the timeline of
+    the new subscriber. Authors who reached the fan-out limit
+    are marked as popular instead."""
+    if follow.author_id in popular_author_ids():
+        return
+    followers = Follow.objects.filter(author_id=follow.author_id).count()
+    if followers >= settings.TIMELINE_FANOUT_LIMIT:
+        PopularAuthor.objects.get_or_create(author_id=follow.author_id)
+        cache.delete(POPULAR_AUTHORS_KEY)
+        return
+    posts = Post.objects.filter(
+        author_id=follow.author_id
+    ).order_by('-pub_date', '-id').values_list('id', 'pub_date')
+    _write_entries([
+        TimelineEntry(
+            user_id=follow.user_id, author_id=follow.author_id,
+            post_id=post_id, pub_date=pub_date
+        )
+        for post_id, pub_date in posts[:settings.TIMELINE_DEPTH]
+    ])
+    trim_depth([follow.user_id])
+
+
+def is_full(user_id):
+    """The function tells whether the timeline of the user holds
+    TIMELINE_DEPTH entries, so older posts may be left out of it."""
+    depth = settings.TIMELINE_DEPTH
+    return TimelineEntry.objects.filter(user_id=user_id).order_by(
+        '-pub_date', '-post_id'
+    )[depth - 1:depth].exists()
+
+
+def trim(follow):
+    """The function removes the author's posts from the timeline
+    of the former subscriber. A full timeline is filled again, since
+    the posts left out of it could move into its depth."""
+    if is_full(follow.user_id):
+        refill(follow.user_id)
+        return
+    TimelineEntry.objects.filter(
+        user_id=follow.user_id, author_id=follow.author_id
+    ).delete()
+
+
+def trim_depth(user_ids):
+    """The function removes the entries lying deeper than TIMELINE_DEPTH
+    from the timelines of the users."""
+    timeline = TimelineEntry._meta.db_table
+    user_ids = list(user_ids)
+    with connection.cursor() as cursor:
+        for start in range(0, len(user_ids), BATCH_SIZE):
+            batch = user_ids[start:start + BATCH_SIZE]
+            marks = ', '.join(['%s'] * len(batch))
+            cursor.execute(
+                f'DELETE FROM {timeline} WHERE id IN (SELECT id FROM '
+                f'(SELECT id, ROW_NUMBER() OVER (PARTITION BY user_id '
+                f'ORDER BY pub_date DESC, post_id DESC) AS position '
+                f'FROM {timeline} WHERE user_id IN ({marks})) '
+                f'WHERE position > %s)',
+                [*batch, settings.TIMELINE_DEPTH]
+            )
+
+
+def _fill_sql(condition='1'):
+    """The function returns the query copying the TIMELINE_DEPTH newest
+    posts of the followed authors, except the popular ones, into the
+    timelines of the subscriptions matching the condition."""
+    return (
+        f'INSERT INTO {TimelineEntry._meta.db_table} (user_id, author_id, '
+        f'post_id, pub_date) SELECT user_id, author_id, post_id, pub_date '
+        f'FROM (SELECT follow.user_id, post.author_id, post.id AS post_id, '
+        f'post.pub_date, ROW_NUMBER() OVER (PARTITION BY follow.user_id '
+        f'ORDER BY post.pub_date DESC, post.id DESC) AS position '
+        f'FROM {Follow._meta.db_table} follow '
+        f'JOIN {Post._meta.db_table} post '
+        f'ON post.author_id = follow.author_id '
+        f'WHERE {condition} AND follow.author_id NOT IN '
+        f'(SELECT author_id FROM {PopularAuthor._meta.db_table})) '
+        f'WHERE position <= %s'
+    )
+
+
+def refill(user_id):
+    """The function fills the timeline of the user from scratch."""
+    with transaction.atomic():
+        TimelineEntry.objects.filter(user_id=user_id).delete()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                _fill_sql('follow.user_id = %s'),
+                [user_id, settings.TIMELINE_DEPTH]
+            )
+
+
+def rebuild():
+    """The function fills all timelines from scratch, for the posts and
+    subscriptions written without signals. The authors with too many
+    subscribers are marked as popular and left out, every timeline
+    keeps its TIMELINE_DEPTH newest entries."""
+    popular = Follow.objects.values('author_id').annotate(
+        followers=Count('id')
+    ).filter(followers__gte=settings.TIMELINE_FANOUT_LIMIT)
+    with transaction.atomic():
+        TimelineEntry.objects.all().delete()
+        PopularAuthor.objects.all().delete()
+        PopularAuthor.objects.bulk_create(
+            PopularAuthor(author_id=row['author_id']) for row in popular
+        )
+        with connection.cursor() as cursor:
+            cursor.execute(_fill_sql(), [settings.TIMELINE_DEPTH])
+    cache.delete(POPULAR_AUTHORS_KEY)
+
+
+class TimelinePaginator(KeysetPaginator):
+    """Paginator over the favourites feed of the user.
+    The materialized timeline is read with an indexed range scan and
+    merged with the cached newest posts of the followed popular authors
+    (see feeds.author_posts). The timeline keeps only the newest posts,
+    deeper pages are read from the posts of the followed authors."""
+    def __init__(self, user, per_page=PER_PAGE):
+        self.user = user
+        self.popular = sorted(following(user, popular_author_ids()))
+        super().__init__(
+            Post.objects.filter(author_id__in=followed_author_ids(user)),
+            per_page, counter=self.count_estimate
+        )
+
+    def count_estimate(self):
+        """The function estimates the length of the feed by the stored
+        counters of the followed authors instead of counting the posts."""
+        return Follow.objects.filter(user=self.user).aggregate(
+            total=Sum('author__stats__posts_count')
+        )['total'] or 0
+
+    def timeline_keys(self, end, cursor=None, newer=False):
+        """The function returns the (pub_date, id) keys of the timeline
+        up to the end of the window or None if the window lies deeper
+        than the kept entries."""
+        depth = settings.TIMELINE_DEPTH
+        entries = TimelineEntry.objects.filter(user=self.user)
+        keys = list(
+            keyset_slice(entries, cursor, newer, id_field='post_id')
+            .values_list('pub_date', 'post_id')[:end]
+        )
+        if cursor is None and end <= depth:
+            return keys
+        horizon = list(
+            entries.order_by('-pub_date', '-post_id')
+            .values_list('pub_date', 'post_id')[depth - 1:depth]
+        )
+        if not horizon:
+            return keys
+        if newer and cursor >= horizon[0]:
+            return keys
+        if not newer and len(keys) == end and keys[-1] >= horizon[0]:
+            return keys
+        return None
+
+    def fetch(self, limit, offset=0, cursor=None, newer=False):
+        end = offset + limit
+        keys = self.timeline_keys(end, cursor, newer)
+        if keys is None:
+            keys = list(
+                keyset_slice(self.object_list, cursor, newer)
+                .values_list('pub_date', 'id')[offset:end]
+            )
+        else:
+            if self.popular:
+                popular = feeds.author_posts(
+                    self.popular, end, 0, cursor, newer
+                )
+                keys = list(feeds.merge([keys, popular], newer))
+            keys = keys[offset:end]
+        posts = Post.objects.for_feed().in_bulk(
+            [post_id for _, post_id in keys]
+        )
+        return [posts[post_id] for _, post_id in keys if post_id in posts]
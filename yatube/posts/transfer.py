@@ -0,0 +1,195 @@
+import datetime
+import gzip
+import json
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils.dateparse import parse_datetime
+
+from .dataset import bulk_insert
+from .models import Comment, Follow, Group, Post
+
+User = get_user_model()
+
+CHUNK_SIZE = 2000
+# Models in the order they are written: every row refers only to the
+# rows of the models above it.
+MODELS = {
+    'group': Group,
+    'post': Post,
+    'comment': Comment,
+    'follow': Follow,
+}
+# Fields referring to users are written as usernames, so the rows can be
+# loaded into a database where the users have other ids.
+USER_FIELDS = {
+    'post': ('author',),
+    'comment': ('author',),
+    'follow': ('user', 'author'),
+}
+DATE_FIELDS = ('pub_date', 'updated', 'created')
+
+
+class Encoder(DjangoJSONEncoder):
+    """JSON encoder keeping the microseconds of the dates."""
+    def default(self, o):
+        if isinstance(o, datetime.datetime):
+            return o.isoformat()
+        return super().default(o)
+
+
+def open_file(path, mode):
+    """The function opens the JSON Lines file, compressed with gzip
+    if its name ends with .gz."""
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def complete_lines(path):
+    """The function yields the complete lines of the file. A gzip stream
+    cut by an interrupted export is read up to the cut."""
+    with open_file(path, 'r') as rows:
+        try:
+            for line in rows:
+                if line.endswith('\n'):
+                    yield line
+        except EOFError:
+            return
+
+
+def drop_partial_gzip(path):
+    """The function rewrites the compressed file of an interrupted export
+    with its complete lines only, so the export can be appended to it.
+    A gzip stream cannot be cut in place."""
+    if not os.path.exists(path):
+        return
+    temporary = path[:-len('.gz')] + '.partial.gz'
+    with open_file(temporary, 'w') as output:
+        output.writelines(complete_lines(path))
+    os.replace(temporary, path)
+
+
+def last_row(path):
+    """The function returns the model and the id of the last complete row
+    of the file or None if there are no rows."""
+    if not os.path.exists(path):
+        return None
+    last = None
+    for line in complete_lines(path):
+        last = line
+    if last is None:
+        return None
+    row = json.loads(last)
+    return row['model'], row['pk']
+
+
+def serialize(name, values):
+    """The function turns the row read from the database into a line."""
+    pk = values.pop('id')
+    for field in USER_FIELDS.get(name, ()):
+        values[field] = values.pop(f'{field}__username')
+    return json.dumps(
+        {'model': name, 'pk': pk, 'fields': values},
+        cls=Encoder, ensure_ascii=False
+    ) + '\n'
+
+
+def export(output, after=None, chunk_size=CHUNK_SIZE):
+    """The function writes the rows of all models to the stream one by one,
+    reading the database in chunks. With after=(model, pk) the export
+    continues after that row. Returns the number of the written rows."""
+    total = 0
+    skipping = after is not None
+    for name, model in MODELS.items():
+        queryset = model.objects.order_by('pk')
+        if skipping:
+            if name != after[0]:
+                continue
+            queryset = queryset.filter(pk__gt=after[1])
+            skipping = False
+        fields = [
+            field.attname for field in model._meta.concrete_fields
+            if field.name not in USER_FIELDS.get(name, ())
+        ]
+        fields += [
+            f'{field}__username' for field in USER_FIELDS.get(name, ())
+        ]
+        for values in queryset.values(*fields).iterator(chunk_size):
+            output.write(serialize(name, values))
+            total += 1
+    return total
+
+
+def _user_ids(usernames):
+    """The function returns the ids of the users, creating the missing
+    ones without a usable password."""
+    found = dict(
+        User.objects.filter(username__in=usernames)
+        .values_list('username', 'id')
+    )
+    missing = set(usernames) - set(found)
+    if missing:
+        User.objects.bulk_create(
+            [User(username=username, password='!') for username in missing],
+            ignore_conflicts=True
+        )
+        found.update(
+            User.objects.filter(username__in=missing)
+            .values_list('username', 'id')
+        )
+    return found
+
+
+def _save(name, rows):
+    model = MODELS[name]
+    usernames = {
+        row['fields'][field]
+        for row in rows for field in USER_FIELDS.get(name, ())
+    }
+    user_ids = _user_ids(usernames) if usernames else {}
+    existing = set(model.objects.filter(
+        pk__in=[row['pk'] for row in rows]
+    ).values_list('pk', flat=True))
+    objects = []
+    for row in rows:
+        if row['pk'] in existing:
+            continue
+        values = dict(row['fields'])
+        for field in USER_FIELDS.get(name, ()):
+            values[f'{field}_id'] = user_ids[values.pop(field)]
+        for field in DATE_FIELDS:
+            if field in values:
+                values[field] = parse_datetime(values[field])
+        objects.append(model(pk=row['pk'], **values))
+    with transaction.atomic():
+        bulk_insert(model, objects)
+
+
+def load(lines, offset=0, batch_size=CHUNK_SIZE, progress=None):
+    """The function saves the rows read from the lines in batches,
+    skipping the first offset lines. Rows whose ids are already present
+    are left as they are, so an interrupted import may be simply
+    repeated. Rows conflicting with other rows of the database raise
+    IntegrityError.
+    progress(number) is called with the number of the last saved line.
+    Returns the number of the read lines."""
+    batch, name, number = [], None, 0
+    for number, line in enumerate(lines, 1):
+        if number <= offset or not line.strip():
+            continue
+        row = json.loads(line)
+        if batch and (row['model'] != name or len(batch) == batch_size):
+            _save(name, batch)
+            if progress:
+                progress(number - 1)
+            batch = []
+        name = row['model']
+        batch.append(row)
+    if batch:
+        _save(name, batch)
+        if progress:
+            progress(number)
+    return number
@@ -1,41 +1,83 @@
 from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
 from django.shortcuts import get_object_or_404, redirect, render
+from django.views.decorators.http import condition
 
+from . import search, thumbnails
+from .caching import (author_scope, get_generation, group_scope, page_etag,
+                      post_scope)
+from .counters import author_stats, feed_count
 from .forms import CommentForm, PostForm
 from .models import Follow, Group, Post
+from .paginator import PER_PAGE, comments_page, decode_cursor, paginate
+from .timeline import TimelinePaginator
 
 User = get_user_model()
 
-PER_PAGE = 10
 
+def index_etag(request):
+    """The validator of the index page."""
+    return page_etag(request, None)
 
+
+def group_etag(request, slug):
+    """The validator of the group page."""
+    group_id = Group.objects.filter(slug=slug).values_list(
+        'pk', flat=True
+    ).first()
+    if group_id is not None:
+        return page_etag(request, group_scope(group_id))
+
+
+def profile_etag(request, username):
+    """The validator of the profile page."""
+    author_id = User.objects.filter(username=username).values_list(
+        'pk', flat=True
+    ).first()
+    if author_id is not None:
+        return page_etag(request, author_scope(author_id))
+
+
+def post_etag(request, username, post_id):
+    """The validator of the post page."""
+    author_id = Post.objects.filter(
+        pk=post_id, author__username=username
+    ).order_by().values_list('author_id', flat=True).first()
+    if author_id is not None:
+        return page_etag(
+            request, author_scope(author_id), post_scope(post_id)
+        )
+
+
+@condition(etag_func=index_etag)
 def index(request):
     """The function returns the model objects to the page template,
     sorting them in descending date order and
-    limiting the number of objects displayed to 10 per page."""
-    post_list = Post.objects.all()
-    paginator = Paginator(post_list, PER_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    limiting the number of objects displayed to 10 per page.
+    Pages are addressed by keyset cursors (?after=, ?before=)."""
+    page = paginate(
+        request, Post.objects.for_feed(),
+        counter=feed_count
+    )
     return render(
         request, 'posts/index.html', {
             'page': page,
+            'cache_generation': get_generation(),
             'is_post_view': False
         }
     )
 
 
+@condition(etag_func=group_etag)
 def group_posts(request, slug):
     """The function returns model objects of a certain template group
     to the page, sorts them in descending order of date, and
     limits the number of objects displayed on the page to 10."""
     group = get_object_or_404(Group, slug=slug)
-    posts = group.groups.all()
-    paginator = Paginator(posts, PER_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    page = paginate(
+        request, group.groups.for_feed(),
+        counter=lambda: feed_count(group_scope(group.pk))
+    )
     return render(
         request, 'posts/group.html', {
             'group': group,
@@ -45,11 +87,27 @@ def group_posts(request, slug):
     )
 
 
+def search_posts(request):
+    """The function finds posts by words of the query and returns them
+    ordered by relevance, 10 per page."""
+    query = request.GET.get('q', '').strip()
+    cursor = search.decode_cursor(request.GET.get('after', ''))
+    posts, next_cursor = search.search_posts(query, cursor, PER_PAGE)
+    return render(
+        request, 'posts/search.html', {
+            'query': query,
+            'posts': posts,
+            'next_cursor': next_cursor,
+            'is_post_view': False
+        }
+    )
+
+
 @login_required
 def new_post(request):
     """The function passes the form to the template and
     saves the data from the form to the database."""
-    form = PostForm(request.POST or None)
+    form = PostForm(request.POST or None, files=request.FILES or None)
     if request.method == 'GET' or not form.is_valid():
         return render(
             request, 'posts/new.html', {'form': form, 'is_new': True}
@@ -58,41 +116,65 @@ def new_post(request):
         post = form.save(commit=False)
         post.author = request.user
         post.save()
+        thumbnails.schedule(post)
         return redirect('index')
 
 
+@condition(etag_func=profile_etag)
 def profile(request, username):
     """The function passes data to the user profile page template."""
     user = get_object_or_404(User, username=username)
-    posts = user.posts.all()
-    paginator = Paginator(posts, PER_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    stats = author_stats(user)
+    page = paginate(
+        request, user.posts.for_feed(), counter=lambda: stats.posts_count
+    )
     return render(
         request, 'posts/profile.html', {
             'author': user,
+            'stats': stats,
             'page': page,
             'is_post_view': False
         }
     )
 
 
+@condition(etag_func=post_etag)
 def post_view(request, username, post_id):
     """The function passes data to the page template of a specific post."""
-    post = get_object_or_404(Post, id=post_id, author__username=username)
+    post = get_object_or_404(
+        Post.objects.for_feed(), id=post_id, author__username=username
+    )
     form = CommentForm()
-    comments = post.comments.all()
+    comments, next_cursor = comments_page(post)
     return render(
         request, 'posts/post.html', {
             'author': post.author,
+            'stats': author_stats(post.author),
             'post': post,
             'form': form,
             'comments': comments,
+            'next_cursor': next_cursor,
             'is_post_view': True
         }
     )
 
 
+@condition(etag_func=post_etag)
+def post_comments(request, username, post_id):
+    """The function returns the next page of the post's comments
+    as an HTML fragment for the "load more" button."""
+    post = get_object_or_404(Post, id=post_id, author__username=username)
+    cursor = decode_cursor(request.GET.get('after', ''))
+    comments, next_cursor = comments_page(post, cursor)
+    return render(
+        request, 'includes/comment_list.html', {
+            'post': post,
+            'comments': comments,
+            'next_cursor': next_cursor
+        }
+    )
+
+
 @login_required
 def post_edit(request, username, post_id):
     """The function transfers data to the post edit page template
@@ -112,7 +194,9 @@ def post_edit(request, username, post_id):
             {'form': form, 'post': post, 'is_new': False}
         )
     else:
-        form.save()
+        post = form.save()
+        if 'image' in form.changed_data:
+            thumbnails.schedule(post)
         return redirect('post_view', username, post.id)
 
 
@@ -150,11 +234,9 @@ def add_comment(request, username, post_id):
 @login_required
 def follow_index(request):
     """The function returns the posts of the authors that
-    the current user is following."""
-    posts = Post.objects.filter(author__following__user=request.user)
-    paginator = Paginator(posts, PER_PAGE)
-    page_number = request.GET.get('page')
-    page = paginator.get_page(page_number)
+    the current user is following, read from the materialized timeline."""
+    paginator = TimelinePaginator(request.user)
+    page = paginator.get_page_from_request(request)
     return render(request, 'posts/follow.html', {'page': page})
 
 
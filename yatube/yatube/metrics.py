@@ -0,0 +1,343 @@
+import hmac
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections
+from django.http import Http404, HttpResponse
+from django.template.backends.django import DjangoTemplates
+from django.utils.module_loading import import_string
+
+# Upper bounds of the histogram buckets.
+SECONDS_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+QUERIES_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+HISTOGRAMS = {
+    'yatube_request_seconds': (
+        'Время обработки запроса.', SECONDS_BUCKETS
+    ),
+    'yatube_request_db_queries': (
+        'Количество запросов к базе данных.', QUERIES_BUCKETS
+    ),
+    'yatube_request_db_seconds': (
+        'Время выполнения запросов к базе данных.', SECONDS_BUCKETS
+    ),
+    'yatube_request_template_seconds': (
+        'Время отрисовки шаблонов.', SECONDS_BUCKETS
+    ),
+}
+COUNTERS = {
+    'yatube_cache_hits': 'Найденные в кэше ключи.',
+    'yatube_cache_misses': 'Не найденные в кэше ключи.',
+}
+# Workers write their samples to the shared store not more often
+# than this, so a request does not turn into a write.
+FLUSH_INTERVAL = 1.0
+
+_local = threading.local()
+_MISSING = object()
+
+
+class RequestMetrics:
+    """Measurements of the request being handled by the thread."""
+    def __init__(self):
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.template_seconds = 0.0
+        self.template_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+
+    def execute(self, execute, sql, params, many, context):
+        """Database execute wrapper counting the queries and their time."""
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.db_seconds += time.perf_counter() - start
+
+
+def current():
+    """The function returns the measurements of the current request
+    or None outside of a request."""
+    return getattr(_local, 'metrics', None)
+
+
+def record_cache(hits, misses):
+    """The function counts the keys found and not found in the cache."""
+    metrics = current()
+    if metrics is not None:
+        metrics.cache_hits += hits
+        metrics.cache_misses += misses
+
+
+class MeasuredCache:
+    """Cache backend counting the keys found and not found in the cache
+    backend it wraps, so the cache metrics work with any of them:
+
+        'BACKEND': 'yatube.metrics.MeasuredCache',
+        'OPTIONS': {'CACHE_BACKEND': '...', ...},
+
+    The other settings are passed to the wrapped backend."""
+    def __init__(self, location, params):
+        options = dict(params.get('OPTIONS', {}))
+        backend = import_string(options.pop('CACHE_BACKEND'))
+        self.cache = backend(location, {**params, 'OPTIONS': options})
+
+    def __getattr__(self, name):
+        return getattr(self.cache, name)
+
+    def __contains__(self, key):
+        return self.has_key(key)
+
+    def get(self, key, default=None, version=None):
+        value = self.cache.get(key, _MISSING, version)
+        if value is _MISSING:
+            record_cache(0, 1)
+            return default
+        record_cache(1, 0)
+        return value
+
+    def get_many(self, keys, version=None):
+        keys = list(keys)
+        found = self.cache.get_many(keys, version)
+        record_cache(len(found), len(keys) - len(found))
+        return found
+
+
+class Registry:
+    """Histograms and counters of the process.
+
+    Samples are accumulated in memory and their increments are added
+    to the SQLite file at METRICS_LOCATION, shared by all worker
+    processes of the host. Without the location only the samples of
+    the current process are exposed.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(float)
+        self._flushed = time.monotonic()
+        self._db_local = threading.local()
+
+    @property
+    def location(self):
+        return getattr(settings, 'METRICS_LOCATION', None)
+
+    def _db(self):
+        db = getattr(self._db_local, 'db', None)
+        owner = (os.getpid(), self.location)
+        if db is None or self._db_local.owner != owner:
+            db = sqlite3.connect(
+                self.location, timeout=30, isolation_level=None,
+                check_same_thread=False
+            )
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=OFF')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS samples ('
+                'name TEXT, view TEXT, le TEXT, value REAL NOT NULL, '
+                'PRIMARY KEY (name, view, le))'
+            )
+            self._db_local.db, self._db_local.owner = db, owner
+        return db
+
+    def observe(self, name, view, value):
+        """The function puts the value into the histogram of the view."""
+        buckets = HISTOGRAMS[name][1]
+        with self._lock:
+            for bound in buckets:
+                if value <= bound:
+                    self._samples[(name + '_bucket', view, str(bound))] += 1
+            self._samples[(name + '_bucket', view, '+Inf')] += 1
+            self._samples[(name + '_sum', view, '')] += value
+            self._samples[(name + '_count', view, '')] += 1
+
+    def increment(self, name, view, value):
+        """The function adds the value to the counter of the view."""
+        if value:
+            with self._lock:
+                self._samples[(name + '_total', view, '')] += value
+
+    def flush(self, force=False):
+        """The function adds the accumulated samples to the shared store."""
+        if not self.location:
+            return
+        if not force and time.monotonic() - self._flushed < FLUSH_INTERVAL:
+            return
+        with self._lock:
+            samples, self._samples = self._samples, defaultdict(float)
+            self._flushed = time.monotonic()
+        if not samples:
+            return
+        db = self._db()
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            db.executemany(
+                'INSERT INTO samples VALUES (?, ?, ?, ?) '
+                'ON CONFLICT (name, view, le) '
+                'DO UPDATE SET value = value + excluded.value',
+                [(*key, value) for key, value in samples.items()]
+            )
+
+    def samples(self):
+        """The function returns the samples of all workers."""
+        if not self.location:
+            with self._lock:
+                return dict(self._samples)
+        self.flush(force=True)
+        rows = self._db().execute(
+            'SELECT name, view, le, value FROM samples'
+        ).fetchall()
+        return {(name, view, le): value for name, view, le, value in rows}
+
+    def clear(self):
+        """The function forgets all samples."""
+        with self._lock:
+            self._samples.clear()
+        if self.location:
+            self._db().execute('DELETE FROM samples')
+
+
+registry = Registry()
+
+
+def _bucket_order(le):
+    return float('inf') if le == '+Inf' else float(le)
+
+
+def _format_value(value):
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def exposition(samples):
+    """The function formats the samples in the Prometheus text format."""
+    families = [
+        (name, 'histogram', help_text, ('_bucket', '_sum', '_count'))
+        for name, (help_text, _) in HISTOGRAMS.items()
+    ] + [
+        (name, 'counter', help_text, ('_total',))
+        for name, help_text in COUNTERS.items()
+    ]
+    lines = []
+    for family, kind, help_text, suffixes in families:
+        lines.append(f'# HELP {family} {help_text}')
+        lines.append(f'# TYPE {family} {kind}')
+        for suffix in suffixes:
+            keys = sorted(
+                (key for key in samples if key[0] == family + suffix),
+                key=lambda key: (
+                    key[1], _bucket_order(key[2]) if key[2] else 0
+                )
+            )
+            for key in keys:
+                name, view, le = key
+                labels = f'view="{view}"'
+                if le:
+                    labels += f',le="{le}"'
+                value = _format_value(samples[key])
+                lines.append(f'{name}{{{labels}}} {value}')
+    return '\n'.join(lines) + '\n'
+
+
+class MetricsMiddleware:
+    """Middleware measuring every request: the wall time, the number and
+    the time of the database queries, the time of the template rendering
+    and the cache hits and misses, grouped by the URL name."""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = _local.metrics = RequestMetrics()
+        start = time.perf_counter()
+        try:
+            with connections['default'].execute_wrapper(metrics.execute):
+                response = self.get_response(request)
+        finally:
+            _local.metrics = None
+        seconds = time.perf_counter() - start
+        match = request.resolver_match
+        view = match.url_name if match and match.url_name else 'unknown'
+        if view != 'metrics':
+            registry.observe('yatube_request_seconds', view, seconds)
+            registry.observe(
+                'yatube_request_db_queries', view, metrics.queries
+            )
+            registry.observe(
+                'yatube_request_db_seconds', view, metrics.db_seconds
+            )
+            registry.observe(
+                'yatube_request_template_seconds', view,
+                metrics.template_seconds
+            )
+            registry.increment('yatube_cache_hits', view, metrics.cache_hits)
+            registry.increment(
+                'yatube_cache_misses', view, metrics.cache_misses
+            )
+            registry.flush()
+        return response
+
+
+class TimedTemplate:
+    """Template measuring the time of its rendering. Templates rendered
+    while another one is rendered are counted as part of the outer one."""
+    def __init__(self, template):
+        self.template = template
+
+    def __getattr__(self, name):
+        return getattr(self.template, name)
+
+    def render(self, context=None, request=None):
+        metrics = current()
+        if metrics is None:
+            return self.template.render(context, request)
+        metrics.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return self.template.render(context, request)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_seconds += time.perf_counter() - start
+
+
+class TimedDjangoTemplates(DjangoTemplates):
+    """Django template backend measuring the rendering time."""
+    def from_string(self, template_code):
+        return TimedTemplate(super().from_string(template_code))
+
+    def get_template(self, template_name):
+        return TimedTemplate(super().get_template(template_name))
+
+
+def is_allowed(request):
+    """The function tells whether the request may read the metrics.
+    Behind a reverse proxy every request comes from its address, so
+    the requests must carry METRICS_TOKEN as a bearer token. Without
+    the token the addresses from INTERNAL_IPS are served in DEBUG only."""
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token:
+        given = request.META.get('HTTP_AUTHORIZATION', '')
+        return hmac.compare_digest(
+            given.encode(), f'Bearer {token}'.encode()
+        )
+    return (
+        settings.DEBUG
+        and request.META.get('REMOTE_ADDR') in settings.INTERNAL_IPS
+    )
+
+
+def metrics_view(request):
+    """The function returns the metrics of all workers in the Prometheus
+    text format to the allowed requests."""
+    if not is_allowed(request):
+        raise Http404
+    return HttpResponse(
+        exposition(registry.samples()),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
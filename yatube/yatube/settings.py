@@ -39,12 +39,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'yatube.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
+    'posts.middleware.PageCacheMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
 ]
@@ -55,7 +57,7 @@ TEMPLATES_DIR = os.path.join(BASE_DIR, "templates")
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'BACKEND': 'yatube.metrics.TimedDjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -83,6 +85,9 @@ DATABASES = {
     }
 }
 
+# Pragmas set on every new SQLite connection, see yatube.sqlite.
+SQLITE_PRAGMAS = {}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -132,12 +137,42 @@ LOGIN_REDIRECT_URL = "index"
 EMAIL_BACKEND = "django.core.mail.backends.filebased.EmailBackend"
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, "sent_emails")
 
+# Per-process cache for development and tests, wrapped to count the hits
+# and misses for the metrics. Multi-worker deployments use the shared
+# memory cache from settings_production.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'yatube.metrics.MeasuredCache',
+        'OPTIONS': {
+            'CACHE_BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        },
     }
 }
 
 INTERNAL_IPS = [
     '127.0.0.1',
 ]
+
+# Authors with at least this many subscribers are not fanned out
+# to the timelines on write, their posts are merged at read time.
+TIMELINE_FANOUT_LIMIT = 5000
+# The number of the newest posts kept in every timeline. Deeper pages
+# of the favourites feed are read from the posts of the followed authors.
+TIMELINE_DEPTH = 200
+
+# SQLite file collecting the metrics of all worker processes of the host.
+# Without it the /metrics/ endpoint shows the current process only.
+METRICS_LOCATION = None
+
+# Bearer token required by the /metrics/ endpoint. Without it the metrics
+# are shown only with DEBUG to the addresses from INTERNAL_IPS.
+METRICS_TOKEN = None
+
+# Seconds the pages are kept in the cache, see posts.middleware.
+# With 0 every request is rendered, so development and tests see
+# the views at work.
+PAGE_CACHE_TIMEOUT = 0
+
+# Threads creating thumbnails of uploaded images in the background.
+# With 0 the thumbnail is created by the first request showing it.
+THUMBNAIL_PREGENERATE_WORKERS = 0
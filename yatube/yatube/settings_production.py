@@ -0,0 +1,41 @@
+"""
+Settings for running yatube with several worker processes on one host.
+
+Select them with DJANGO_SETTINGS_MODULE=yatube.settings_production.
+"""
+import os
+
+from .settings import *  # noqa: F401,F403
+from .shm_cache import DEFAULT_LOCATION, SHM_DIR
+from .sqlite import PRODUCTION_PRAGMAS
+
+DEBUG = False
+
+# Connections are kept open between requests, so the pragmas and the
+# page cache of SQLite are not lost after every request.
+DATABASES['default']['CONN_MAX_AGE'] = 600  # noqa: F405
+SQLITE_PRAGMAS = PRODUCTION_PRAGMAS
+
+# One cache for all workers of the host: invalidation made by one
+# worker is seen by the others at once.
+CACHES = {
+    'default': {
+        'BACKEND': 'yatube.metrics.MeasuredCache',
+        'LOCATION': DEFAULT_LOCATION,
+        'OPTIONS': {
+            'CACHE_BACKEND': 'yatube.shm_cache.SharedMemoryCache',
+            'MAX_ENTRIES': 100000,
+            'MMAP_SIZE': 256 * 1024 * 1024,
+        },
+    }
+}
+
+THUMBNAIL_PREGENERATE_WORKERS = 4
+
+PAGE_CACHE_TIMEOUT = 60 * 60
+
+METRICS_LOCATION = os.path.join(SHM_DIR, 'yatube-metrics.sqlite3')
+
+# The proxy forwards every request from its own address, so the metrics
+# are served only with the token; the endpoint is closed without it.
+METRICS_TOKEN = os.environ.get('YATUBE_METRICS_TOKEN')
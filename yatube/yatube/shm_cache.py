@@ -0,0 +1,202 @@
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SHM_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+DEFAULT_LOCATION = os.path.join(SHM_DIR, 'yatube-cache.sqlite3')
+DEFAULT_MMAP_SIZE = 256 * 1024 * 1024
+# The access time of an entry is refreshed not more often than this,
+# so frequent reads of a hot key do not turn into writes.
+TOUCH_RESOLUTION = 1.0
+
+
+class SharedMemoryCache(BaseCache):
+    """Cache shared by all worker processes of one host.
+
+    Entries are kept in an SQLite table placed on the memory file system
+    (/dev/shm) and mapped into every process with mmap. SQLite file locks
+    make reads and writes safe across processes. Every entry has its own
+    expiry time, and the least recently used entries are evicted when
+    the number of entries exceeds MAX_ENTRIES.
+    """
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._path = location or DEFAULT_LOCATION
+        options = params.get('OPTIONS', {})
+        self._mmap_size = int(options.get('MMAP_SIZE', DEFAULT_MMAP_SIZE))
+        self._local = threading.local()
+
+    @property
+    def _db(self):
+        # Connections are not shared between threads or forked workers.
+        db = getattr(self._local, 'db', None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(
+                self._path, timeout=30, isolation_level=None,
+                check_same_thread=False
+            )
+            db.execute('PRAGMA journal_mode=WAL')
+            db.execute('PRAGMA synchronous=OFF')
+            db.execute(f'PRAGMA mmap_size={self._mmap_size}')
+            db.execute(
+                'CREATE TABLE IF NOT EXISTS cache ('
+                'key TEXT PRIMARY KEY, value BLOB NOT NULL, '
+                'expires REAL, accessed REAL NOT NULL)'
+            )
+            db.execute(
+                'CREATE INDEX IF NOT EXISTS cache_accessed '
+                'ON cache (accessed)'
+            )
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    @staticmethod
+    def _alive(expires, now):
+        return expires is None or expires > now
+
+    def _write(self, db, key, value, timeout, only_new=False):
+        now = time.time()
+        expires = self.get_backend_timeout(timeout)
+        blob = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if only_new:
+            db.execute(
+                'DELETE FROM cache WHERE key = ? AND expires <= ?',
+                (key, now)
+            )
+            cursor = db.execute(
+                'INSERT OR IGNORE INTO cache VALUES (?, ?, ?, ?)',
+                (key, blob, expires, now)
+            )
+            return cursor.rowcount == 1
+        db.execute(
+            'INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?)',
+            (key, blob, expires, now)
+        )
+        return True
+
+    def _cull(self, db):
+        if self._max_entries <= 0:
+            return
+        (count,) = db.execute('SELECT COUNT(*) FROM cache').fetchone()
+        if count <= self._max_entries:
+            return
+        db.execute(
+            'DELETE FROM cache WHERE expires <= ?', (time.time(),)
+        )
+        (count,) = db.execute('SELECT COUNT(*) FROM cache').fetchone()
+        if count > self._max_entries:
+            db.execute(
+                'DELETE FROM cache WHERE key IN ('
+                'SELECT key FROM cache ORDER BY accessed LIMIT ?)',
+                (max(count // self._cull_frequency, 1),)
+            )
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        db = self._db
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            added = self._write(db, key, value, timeout, only_new=True)
+            if added:
+                self._cull(db)
+        return added
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        db = self._db
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            for key, value in data.items():
+                self._write(db, self._key(key, version), value, timeout)
+            self._cull(db)
+        return []
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        keys = {self._key(key, version): key for key in keys}
+        if not keys:
+            return {}
+        now = time.time()
+        placeholders = ', '.join('?' * len(keys))
+        rows = self._db.execute(
+            f'SELECT key, value, expires, accessed FROM cache '
+            f'WHERE key IN ({placeholders})', list(keys)
+        ).fetchall()
+        found, stale = {}, []
+        for key, blob, expires, accessed in rows:
+            if not self._alive(expires, now):
+                continue
+            found[keys[key]] = pickle.loads(blob)
+            if now - accessed > TOUCH_RESOLUTION:
+                stale.append(key)
+        if stale:
+            self._db.execute(
+                f'UPDATE cache SET accessed = ? '
+                f'WHERE key IN ({", ".join("?" * len(stale))})',
+                [now, *stale]
+            )
+        return found
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        cursor = self._db.execute(
+            'UPDATE cache SET expires = ?, accessed = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), time.time(), key,
+             time.time())
+        )
+        return cursor.rowcount == 1
+
+    def delete(self, key, version=None):
+        return self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self._key(key, version) for key in keys]
+        if not keys:
+            return False
+        cursor = self._db.execute(
+            f'DELETE FROM cache WHERE key IN ({", ".join("?" * len(keys))})',
+            keys
+        )
+        return cursor.rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        row = self._db.execute(
+            'SELECT expires FROM cache WHERE key = ?', (key,)
+        ).fetchone()
+        return row is not None and self._alive(row[0], time.time())
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        db = self._db
+        with db:
+            db.execute('BEGIN IMMEDIATE')
+            row = db.execute(
+                'SELECT value, expires FROM cache WHERE key = ?', (key,)
+            ).fetchone()
+            if row is None or not self._alive(row[1], time.time()):
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            db.execute(
+                'UPDATE cache SET value = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key)
+            )
+        return value
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache')
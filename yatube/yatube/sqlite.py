@@ -0,0 +1,30 @@
+from django.conf import settings
+
+# Pragmas for a database shared by several worker processes. WAL lets
+# readers work while a writer commits, and with synchronous=NORMAL
+# a commit does not wait for fsync (only the last transactions may be
+# lost on power failure, the database itself stays consistent).
+PRODUCTION_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,
+    'temp_store': 'MEMORY',
+}
+
+
+def apply_pragmas(cursor, pragmas):
+    """The function sets the pragmas on the SQLite connection."""
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name}={value}')
+
+
+def configure_connection(sender, connection, **kwargs):
+    """The function tunes every new SQLite connection with the pragmas
+    from the SQLITE_PRAGMAS setting."""
+    pragmas = getattr(settings, 'SQLITE_PRAGMAS', None)
+    if connection.vendor != 'sqlite' or not pragmas:
+        return
+    with connection.cursor() as cursor:
+        apply_pragmas(cursor, pragmas)